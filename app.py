@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import pymongo
 import pdfplumber
@@ -16,14 +16,38 @@ import logging
 import requests
 from pdf2image import convert_from_path
 import pytesseract
+try:
+    import brotli
+except ImportError:
+    brotli = None
 import tempfile
 import io
 import asyncio
 import aiohttp
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from werkzeug.utils import secure_filename
-import validators
 import time
+import hashlib
+import functools
+import gzip
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.skill_taxonomy import classify_skills, get_skill_matcher
+from app.utils.layout_segmenter import segment_pdf
+from app.utils.reprocess import ReprocessEngine
+from app.utils.llm_batch import MessageBatchClient
+from app.utils.cache import LRUCache
+from app.utils.export import export_profiles, flatten_profile, iter_profiles, jsonl_lines
+from app.utils.safe_regex import MatchBudget
+from app.utils.contact_fields import build_contact_patterns, extract_regex_fields, social_line_platforms
+from app.utils.llm_metrics import (
+    LLMMetrics, add_message_usage, finish_usage, format_report, iter_usage, new_usage, usage_report
+)
+from app.utils.pipeline import Pipeline, PipelineError, PipelineResult, Stage
+from app.utils.profiling import ProfileCapture, ProfileStore, annotate, profile_stage, should_profile
+from app.utils.search_index import (
+    PostingIndex, ensure_search_indexes, load_index_in_background, mongo_filter, profile_terms, query_terms, sync_index
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -59,12 +83,30 @@ load_dotenv()
 class Config:
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/anthropic_resumeparser")
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+    ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
+    LLM_BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", "10"))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "Uploads")
     ALLOWED_MIMETYPES = {
         "application/pdf",
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
     }
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5 MB
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+    SEARCH_MAX_PER_PAGE = 100
+    REGEX_BUDGET_SECONDS = float(os.getenv("REGEX_BUDGET_SECONDS", "0.25"))
+    NLP_MAX_CHARS = int(os.getenv("NLP_MAX_CHARS", "100000"))
+    FAST_PATH_MAX_CHARS = int(os.getenv("FAST_PATH_MAX_CHARS", "6000"))
+    BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "2"))
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+    PIPELINE_CACHE_ENTRIES = int(os.getenv("PIPELINE_CACHE_ENTRIES", "256"))
+    PIPELINE_CACHE_STAGES = [s for s in os.getenv("PIPELINE_CACHE_STAGES", "extract").split(",") if s]
+    PROFILE_CACHE_ENTRIES = int(os.getenv("PROFILE_CACHE_ENTRIES", "2048"))
+    PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "60"))
+    COMPRESS_MIN_BYTES = 1024
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
 
     def __init__(self):
         if not self.ANTHROPIC_API_KEY:
@@ -79,6 +121,7 @@ try:
     user_collection = db["users_anthropic"]
     profile_collection = db["user_profile_data"]
     profile_collection.create_index([("username", pymongo.ASCENDING)])
+    ensure_search_indexes(profile_collection)
     client.admin.command('ping')
     logger.info("MongoDB connected successfully")
 except Exception as e:
@@ -91,10 +134,37 @@ try:
 except Exception as e:
     raise Exception(f"spaCy load error: {e}")
 
+# In-memory posting lists over `search_terms`, loaded in the background at startup;
+# until then searches are answered from the multikey index
+search_index = PostingIndex()
+load_index_in_background(search_index, profile_collection)
+
+# Serialized profile responses keyed by (username, projection); invalidated on upsert.
+# Other processes only see a change after PROFILE_CACHE_TTL_SECONDS.
+profile_cache = LRUCache(app.config["PROFILE_CACHE_ENTRIES"])
+
+# Recent request profiles; sampled ones are written to PROFILE_DIR as folded stacks
+profile_store = ProfileStore(app.config["PROFILE_DIR"])
+
+# Token, latency and cost counters for every LLM call made by this process
+llm_metrics = LLMMetrics()
+
+# Full-document processing for `mode=fast` uploads, after the contact card has been saved
+background_executor = ThreadPoolExecutor(max_workers=app.config["BACKGROUND_WORKERS"], thread_name_prefix="resume-full")
+
 # Ensure upload folder exists
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
 # Constants
+# Bump PARSER_VERSION when the regex/NER layer, taxonomy or segmenter changes and
+# PROMPT_VERSION when the LLM prompt or model changes; `python app.py reprocess`
+# then refreshes stored profiles from their pdfText.
+SCHEMA_VERSION = 1
+# Fields structure_resume_for_storage may produce; any it leaves out are unset on refresh
+STRUCTURED_FIELDS = ["name", "email", "phone", "state", "social_media", "career_objective", "education", "experience", "skills", "projects", "certifications", "achievements"]
+PARSER_VERSION = 1
+PROMPT_VERSION = 1
+
 STATES = [
     "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware", "Florida",
     "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas", "Kentucky", "Louisiana", "Maine",
@@ -104,6 +174,10 @@ STATES = [
     "Utah", "Vermont", "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming"
 ]
 
+# Compiled once; linear-time patterns with chunked, time-budgeted scanning
+CONTACT_PATTERNS = build_contact_patterns(STATES)
+MAX_HEADER_LINE_CHARS = 60
+
 SECTION_ALIASES = {
     "career_objective": {"career objective", "objective", "professional summary", "summary", "profile", "about me", "career goals", "personal profile"},
     "education": {"education", "academic background", "academic qualifications", "degrees"},
@@ -115,12 +189,14 @@ SECTION_ALIASES = {
     "social_media": {"social media", "online profiles", "links", "contact links"}
 }
 
+KNOWN_SECTION_HEADERS = set().union(*SECTION_ALIASES.values())
+
 def normalize_section_name(name: str) -> str:
-    name_clean = name.lower().strip(":").strip().replace(" ", "_")
+    name_lower = re.sub(r"\s+", " ", name.lower().strip(":").strip())
     for standard, aliases in SECTION_ALIASES.items():
-        if name_clean in aliases:
+        if name_lower in aliases:
             return standard
-    return name_clean
+    return name_lower.replace(" ", "_")
 
 def safe_join_list(items: List) -> str:
     return "\n".join(str(i).strip() for i in items if isinstance(i, (str, int, float)) and i not in ["...", Ellipsis])
@@ -132,6 +208,20 @@ def ensure_list(obj) -> List:
         return []
     return [obj]
 
+def ocr_pdf(file_path: str, first_page: Optional[int] = None, last_page: Optional[int] = None) -> str:
+    pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_PATH", r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
+    images = convert_from_path(
+        file_path,
+        first_page=first_page,
+        last_page=last_page,
+        poppler_path=os.getenv("POPPLER_PATH", r"C:\\Program Files\\poppler\\bin")
+    )
+    ocr_text = ""
+    for img in images:
+        ocr_text += pytesseract.image_to_string(img, lang="eng") + "\n"
+    return ocr_text.encode("utf-8", errors="ignore").decode("utf-8").strip()
+
+@profile_stage()
 def extract_text_from_pdf(file_path: str) -> str:
     try:
         with pdfplumber.open(file_path) as pdf:
@@ -151,16 +241,12 @@ def extract_text_from_pdf(file_path: str) -> str:
         logger.warning(f"pdfplumber extraction failed: {e}")
     
     try:
-        pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_PATH", r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
-        images = convert_from_path(file_path, poppler_path=os.getenv("POPPLER_PATH", r"C:\\Program Files\\poppler\\bin"))
-        ocr_text = ""
-        for img in images:
-            ocr_text += pytesseract.image_to_string(img, lang="eng") + "\n"
-        return ocr_text.encode("utf-8", errors="ignore").decode("utf-8").strip()
+        return ocr_pdf(file_path)
     except Exception as e:
         logger.error(f"OCR extraction failed: {e}")
         raise ValueError(f"Failed to extract text from PDF: {e}")
 
+@profile_stage()
 def extract_text_from_docx(file_path: str) -> str:
     try:
         doc = Document(file_path)
@@ -193,6 +279,44 @@ def extract_text_from_file(file_path: str, file_type: str) -> str:
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
+@profile_stage()
+def extract_document(file_path: str, file_type: str) -> Tuple[str, Optional[List[Tuple[str, List[str]]]]]:
+    """
+    Return (text, section spans). Text-based PDFs go through the layout
+    segmenter, which reads word/font metadata once and returns sections
+    detected from typography; scanned PDFs (no words) and DOCX fall back to
+    plain extraction with line-based section detection (spans = None), as
+    do PDFs where the segmenter finds no headers.
+    """
+    if file_type == "application/pdf":
+        try:
+            segmented = segment_pdf(file_path, known_headers=KNOWN_SECTION_HEADERS)
+            if segmented["text"]:
+                # No typographic headers found: let the line-based detection try instead
+                return segmented["text"], segmented["sections"] or None
+            logger.warning("No words found by layout segmenter, falling back to OCR")
+        except Exception as e:
+            logger.warning(f"Layout segmentation failed: {e}")
+    return extract_text_from_file(file_path, file_type), None
+
+@profile_stage()
+def extract_first_page(file_path: str, file_type: str) -> str:
+    """
+    Fast-path text: page 1 of a PDF (OCR of page 1 only for scans) or the
+    start of a DOCX, capped at FAST_PATH_MAX_CHARS. Contact details almost
+    always live here, so they can be saved before the full document is read.
+    """
+    max_chars = app.config["FAST_PATH_MAX_CHARS"]
+    if file_type != "application/pdf":
+        return extract_text_from_file(file_path, file_type)[:max_chars]
+    try:
+        text = segment_pdf(file_path, known_headers=KNOWN_SECTION_HEADERS, max_pages=1)["text"]
+        if text:
+            return text[:max_chars]
+    except Exception as e:
+        logger.warning(f"First-page extraction failed: {e}")
+    return ocr_pdf(file_path, first_page=1, last_page=1)[:max_chars]
+
 def preprocess_text(text: str) -> str:
     if isinstance(text, list):
         text = safe_join_list(text)
@@ -200,13 +324,18 @@ def preprocess_text(text: str) -> str:
     text = re.sub(r"[^\w\s.,;@\-/]", "", text)
     return text.strip()
 
-def extract_data_spacy_regex(text: str) -> Dict:
-    try:
-        doc = nlp(text)
-    except Exception as e:
-        logger.error(f"spaCy processing error: {e}")
-        return {"error": str(e)}
-    
+def add_section_line(sections: Dict[str, List[str]], section: str, line: str):
+    # For career_objective, combine multi-line entries if they form a paragraph
+    if section == "career_objective" and sections[section] and len(line) > 10:
+        sections[section][-1] += " " + line
+    # Filter out short or irrelevant lines, except skills: often one short name per line (SQL, Go, K8s)
+    elif section == "skills" or len(line) > 5:
+        sections[section].append(line)
+
+def extract_contact_fields(text: str, doc=None) -> Dict:
+    """Name, email, phone, state and social links: the contact card the fast path saves first."""
+    if doc is None:
+        doc = nlp(text[:app.config["NLP_MAX_CHARS"]])
     data = {}
     for ent in doc.ents:
         if ent.label_ == "PERSON" and "name" not in data:
@@ -219,55 +348,56 @@ def extract_data_spacy_regex(text: str) -> Dict:
         lines = text.splitlines()
         data["name"] = lines[0].strip() if lines else "Unknown"
     
-    email_pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    phone_pattern = r"(\+?\d{1,3})?[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?:\s?(?:x|ext\.?)\s?\d{1,5})?"
-    social_media_patterns = {
-        "linkedin": r"(?:https?://)?(?:www\.)?linkedin\.com/(?:in|pub|company)/[a-zA-Z0-9-]+/?",
-        "github": r"(?:https?://)?(?:www\.)?github\.com/[a-zA-Z0-9-]+/?",
-        "twitter": r"(?:https?://)?(?:www\.)?(?:twitter\.com|x\.com)/[a-zA-Z0-9_]+/?",
-        "portfolio": r"(?:https?://)?(?:www\.)?[a-zA-Z0-9-]+\.[a-zA-Z]{2,}/?(?:portfolio)?(?:/[a-zA-Z0-9-]+)?/?",
-    }
+    budget = MatchBudget(app.config["REGEX_BUDGET_SECONDS"])
+    regex_fields = extract_regex_fields(text, CONTACT_PATTERNS, budget)
+    data["email"] = regex_fields["email"]
+    data["phone"] = regex_fields["phone"]
+    if regex_fields["state"] and "state" not in data:
+        data["state"] = regex_fields["state"]
+    data["social_media"] = regex_fields["social_media"]
+    if budget.degraded:
+        annotate(regex_degraded=budget.degraded)
+    return data
+
+@profile_stage()
+def extract_data_spacy_regex(text: str, section_spans: Optional[List[Tuple[str, List[str]]]] = None) -> Dict:
+    try:
+        # NER cost grows with input; names and states sit near the top, so long OCR noise is cut off
+        doc = nlp(text[:app.config["NLP_MAX_CHARS"]])
+    except Exception as e:
+        logger.error(f"spaCy processing error: {e}")
+        return {"error": str(e)}
+    
+    data = extract_contact_fields(text, doc)
     
-    email = re.search(email_pattern, text, re.IGNORECASE)
-    data["email"] = email.group() if email else None
-    if data["email"] and not validators.email(data["email"]):
-        logger.warning(f"Invalid email format: {data['email']}")
-        data["email"] = None
-    
-    phone = re.search(phone_pattern, text)
-    data["phone"] = phone.group() if phone else None
-    
-    state_pattern = r"\b(" + "|".join(STATES) + r")\b"
-    state = re.search(state_pattern, text, re.IGNORECASE)
-    if state and "state" not in data:
-        data["state"] = state.group()
-    
-    data["social_media"] = {}
-    for platform, pattern in social_media_patterns.items():
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        valid_urls = [url for url in matches if validators.url(url) or validators.url("https://" + url)]
-        if valid_urls:
-            data["social_media"][platform] = valid_urls[0]
-    
-    lines = text.split("\n")
-    current_section = None
     data["sections"] = {}
-    section_header_pattern = r"^(?:[A-Z][a-zA-Z\s&]{1,50}|[A-Z\s&]{2,50}):?$"
-    
-    # Enhanced career objective handling
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        if re.match(section_header_pattern, line, re.IGNORECASE):
-            current_section = normalize_section_name(line)
-            data["sections"][current_section] = []
-        elif current_section:
-            # For career_objective, combine multi-line entries if they form a paragraph
-            if current_section == "career_objective" and data["sections"][current_section] and len(line) > 10:
-                data["sections"][current_section][-1] += " " + line
-            elif len(line) > 5:  # Filter out short or irrelevant lines
-                data["sections"][current_section].append(line)
+    if section_spans is not None:
+        # Headers already detected from typography by the layout segmenter
+        for header, span_lines in section_spans:
+            current_section = normalize_section_name(header)
+            data["sections"].setdefault(current_section, [])
+            for line in span_lines:
+                line = line.strip()
+                if line:
+                    add_section_line(data["sections"], current_section, line)
+    else:
+        lines = text.split("\n")
+        current_section = None
+        section_header_pattern = r"^(?:[A-Z][a-zA-Z\s&]{1,50}|[A-Z\s&]{2,50}):?$"
+        
+        # Enhanced career objective handling
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            # A bare skill name inside the skills section (Python, Go) is an item, not a new header
+            is_skill_item = (current_section == "skills" and line.lower().strip(":") not in KNOWN_SECTION_HEADERS
+                             and get_skill_matcher().lookup(line) is not None)
+            if not is_skill_item and len(line) <= MAX_HEADER_LINE_CHARS and re.match(section_header_pattern, line, re.IGNORECASE):
+                current_section = normalize_section_name(line)
+                data["sections"][current_section] = []
+            elif current_section:
+                add_section_line(data["sections"], current_section, line)
     
     # Validate career objective entries
     if "career_objective" in data["sections"]:
@@ -280,13 +410,10 @@ def extract_data_spacy_regex(text: str) -> Dict:
     
     return data
 
-async def extract_data_llm(text: str) -> Dict:
-    headers = {
-        "x-api-key": app.config['ANTHROPIC_API_KEY'],
-        "anthropic-version": "2023-06-01",
-        "Content-Type": "application/json"
-    }
-    
+LLM_MODEL = "claude-3-5-sonnet-20240620"
+LLM_MAX_INPUT_CHARS = 8000
+
+def build_llm_payload(text: str) -> Dict:
     prompt = (
         "You are a resume parsing expert. Extract information from the provided resume text and return a JSON object with the following structure:\n"
         "{\n"
@@ -314,41 +441,77 @@ async def extract_data_llm(text: str) -> Dict:
         "- Parse dates in a consistent format (e.g., 'MM/YYYY - MM/YYYY' or 'Present').\n"
         "- For complex layouts, infer sections based on context or common resume patterns.\n"
         "- If a section is ambiguous, place it under 'other_skills' or 'achievements' as appropriate.\n"
-        "Resume text:\n" + text[:8000]
+        "Resume text:\n" + text[:LLM_MAX_INPUT_CHARS]
     )
     
-    payload = {
-        "model": "claude-3-5-sonnet-20240620",
+    return {
+        "model": LLM_MODEL,
         "temperature": 0.5,
         "max_tokens": 2000,
         "messages": [{"role": "user", "content": prompt}]
     }
+
+def parse_llm_message(out: Dict) -> Dict:
+    msg_content = out.get("content", [])
+    text_part = ""
+    for msg in msg_content:
+        if msg.get("type") == "text":
+            text_part += msg.get("text", "")
+    json_match = re.search(r"```json\n(.*?)\n```", text_part, re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group(1))
+        except json.JSONDecodeError as e:
+            logger.error(f"LLM JSON parsing error: {e}")
+            return {"error": f"Invalid JSON from LLM: {e}", "raw_content": text_part}
+    return {"error": "No JSON block found in LLM response", "raw_content": text_part}
+
+def record_llm_usage(usage: Dict):
+    llm_metrics.record(usage)
+    annotate(llm_input_tokens=usage["input_tokens"], llm_output_tokens=usage["output_tokens"],
+             llm_ttfb_ms=usage["ttfb_ms"], llm_total_ms=usage["total_ms"], llm_retries=usage["retries"])
+    logger.info(
+        f"LLM {usage['stage']} call: {usage['input_tokens']} in / {usage['output_tokens']} out tokens, "
+        f"ttfb {usage['ttfb_ms']} ms, total {usage['total_ms']} ms, {usage['retries']} retries, "
+        f"{usage['input_chars']} chars{' (truncated)' if usage['truncated'] else ''}, status {usage['status']}"
+    )
+
+@profile_stage()
+async def extract_data_llm(text: str, stage: str = "upload") -> Tuple[Dict, Dict]:
+    """
+    Return (parsed data or {"error": ...}, usage record). The usage record
+    holds token counts from the response's `usage` block, time to response
+    headers of the last attempt (ttfb_ms), wall time across all attempts
+    (total_ms), the retry count and the input size before and after the
+    LLM_MAX_INPUT_CHARS cut. It is also added to `llm_metrics`.
+    """
+    headers = {
+        "x-api-key": app.config['ANTHROPIC_API_KEY'],
+        "anthropic-version": "2023-06-01",
+        "Content-Type": "application/json"
+    }
+    payload = build_llm_payload(text)
+    usage = new_usage(payload, text, LLM_MAX_INPUT_CHARS, stage)
+    started = time.perf_counter()
     
     async def try_request():
         async with aiohttp.ClientSession() as session:
             for attempt in range(3):
+                usage["retries"] = attempt
+                attempt_started = time.perf_counter()
                 try:
                     async with session.post(
-                        "https://api.anthropic.com/v1/messages",
+                        f"{app.config['ANTHROPIC_BASE_URL']}/v1/messages",
                         headers=headers,
                         json=payload,
                         timeout=60
                     ) as res:
+                        usage["ttfb_ms"] = round((time.perf_counter() - attempt_started) * 1000, 2)
+                        usage["http_status"] = res.status
                         if res.status == 200:
-                            out = await res.json()
-                            msg_content = out.get("content", [])
-                            text_part = ""
-                            for msg in msg_content:
-                                if msg.get("type") == "text":
-                                    text_part += msg.get("text", "")
-                            json_match = re.search(r"```json\n(.*?)\n```", text_part, re.DOTALL)
-                            if json_match:
-                                try:
-                                    return json.loads(json_match.group(1))
-                                except json.JSONDecodeError as e:
-                                    logger.error(f"LLM JSON parsing error: {e}")
-                                    return {"error": f"Invalid JSON from LLM: {e}", "raw_content": text_part}
-                            return {"error": "No JSON block found in LLM response", "raw_content": text_part}
+                            message = await res.json()
+                            add_message_usage(usage, message)
+                            return parse_llm_message(message)
                         else:
                             logger.warning(f"LLM API error: {res.status} {await res.text()}")
                 except Exception as e:
@@ -356,13 +519,47 @@ async def extract_data_llm(text: str) -> Dict:
                     if attempt == 2:
                         return {"error": f"LLM API request failed after retries: {e}"}
                     await asyncio.sleep(1)
+        return {"error": "LLM API request failed after retries"}
     
-    return await try_request()
+    data = await try_request()
+    record_llm_usage(finish_usage(usage, started, data))
+    return data, usage
 
+async def extract_data_llm_bulk(texts: Dict[str, str]) -> Dict[str, Tuple[Dict, Dict]]:
+    """
+    Extract many resumes through one Message Batches job instead of one
+    interactive request each. `texts` maps a key (username) to preprocessed
+    text; the result maps the same key to (parsed LLM data or {"error": ...},
+    usage record).
+    Only failed items are resubmitted.
+    """
+    client = MessageBatchClient(
+        app.config["ANTHROPIC_API_KEY"],
+        base_url=app.config["ANTHROPIC_BASE_URL"],
+        poll_interval=app.config["LLM_BATCH_POLL_SECONDS"]
+    )
+    payloads = {key: build_llm_payload(text) for key, text in texts.items()}
+    started = time.perf_counter()
+    responses = await client.run(payloads)
+    results = {}
+    for key, response in responses.items():
+        # Batch items have no per-request timing; total_ms is the wall time of the whole job
+        usage = new_usage(payloads[key], texts[key], LLM_MAX_INPUT_CHARS, "import", mode="batch")
+        if "message" in response:
+            add_message_usage(usage, response["message"])
+            usage["retries"] = response.get("attempts", 1) - 1
+            data = parse_llm_message(response["message"])
+        else:
+            data = response
+        llm_metrics.record(finish_usage(usage, started, data))
+        results[key] = (data, usage)
+    return results
+
+@profile_stage()
 def structure_resume_for_storage(spacy_data: Dict, llm_data: Dict) -> Dict:
     result = {
-        "schema_version": 1,
-        "section_order": ["name", "email", "phone", "state", "social_media", "career_objective", "education", "experience", "skills", "projects", "certifications", "achievements"]
+        "schema_version": SCHEMA_VERSION,
+        "section_order": list(STRUCTURED_FIELDS)
     }
     
     for field in ["name", "email", "phone", "state"]:
@@ -387,19 +584,17 @@ def structure_resume_for_storage(spacy_data: Dict, llm_data: Dict) -> Dict:
         if social_media_struct[platform] is None and platform in spacy_social_media:
             social_media_struct[platform] = spacy_social_media[platform]
     
+    # Section lines are untrusted: guarded patterns and one budget for the whole section
     spacy_social_section = spacy_data.get("sections", {}).get("social_media", [])
+    budget = MatchBudget(app.config["REGEX_BUDGET_SECONDS"])
     for item in spacy_social_section:
-        for platform, pattern in {
-            "linkedin": r"linkedin\.com",
-            "github": r"github\.com",
-            "twitter": r"(?:twitter\.com|x\.com)",
-            "portfolio": r"(?:portfolio|[a-zA-Z0-9-]+\.[a-zA-Z]{2,}/)"
-        }.items():
-            if re.search(pattern, item, re.IGNORECASE):
-                if platform not in social_media_struct or social_media_struct[platform] is None:
-                    social_media_struct[platform] = item
-                else:
-                    social_media_struct["other"].append(item)
+        for platform in social_line_platforms(item, CONTACT_PATTERNS, budget):
+            if social_media_struct[platform] is None:
+                social_media_struct[platform] = item
+            else:
+                social_media_struct["other"].append(item)
+    if budget.degraded:
+        annotate(regex_degraded=budget.degraded)
     
     result["social_media"] = {k: v for k, v in social_media_struct.items() if v}
     
@@ -443,32 +638,169 @@ def structure_resume_for_storage(spacy_data: Dict, llm_data: Dict) -> Dict:
         "languages": [],
         "other_skills": []
     }
-    llm_skills = llm_data.get("skills", {})
+    llm_skills = llm_data.get("skills")
     if isinstance(llm_skills, dict):
         for category in skills_struct:
-            skills_struct[category] = [str(s).strip() for s in ensure_list(llm_skills.get(category, []))]
-    else:
+            skills_struct[category] = [str(s).strip() for s in ensure_list(llm_skills.get(category, [])) if str(s).strip()]
+    if not any(skills_struct.values()):
+        # LLM gave no skills: one pass of the taxonomy matcher over the section; canonical names, unknowns go to other_skills
         spacy_skills = spacy_data.get("sections", {}).get("skills", [])
-        for skill in spacy_skills:
-            skill = str(skill).strip().lower()
-            if re.match(r"python|java|javascript|c\+\+|sql|html|css|react|angular|node\.js|docker|aws|git", skill, re.IGNORECASE):
-                skills_struct["technical_skills"].append(skill)
-            elif re.match(r"spanish|french|german|chinese|japanese|english", skill, re.IGNORECASE):
-                skills_struct["languages"].append(skill)
-            elif re.match(r"teamwork|communication|leadership|problem\s?solving|adaptability", skill, re.IGNORECASE):
-                skills_struct["soft_skills"].append(skill)
-            else:
-                skills_struct["other_skills"].append(skill)
+        skills_struct.update(classify_skills(spacy_skills))
     
     result["skills"] = {k: v for k, v in skills_struct.items() if v}
     
     return result
 
+@profile_stage()
+def extract_contact_card(file_path: str, file_type: str) -> Dict:
+    """Contact fields from the first page only; sections are left to the full pass."""
+    return extract_contact_fields(extract_first_page(file_path, file_type))
+
+def save_contact_card(username: str, card: Dict):
+    now = datetime.datetime.utcnow()
+    profile_collection.update_one(
+        {"username": username},
+        {
+            "$set": {**card, "username": username, "processing_status": "processing", "updated_at": now},
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )
+    profile_cache.invalidate(username)
+
+def add_search_terms(structured: Dict) -> Dict:
+    structured["search_terms"] = profile_terms(structured)
+    return structured
+
+def build_profile_document(username: str, raw_text: str, file_buffer: bytes, spacy_data: Dict, llm_data: Dict,
+                           llm_usage: Optional[Dict] = None,
+                           section_spans: Optional[List[Tuple[str, List[str]]]] = None) -> Dict:
+    structured = structure_resume_for_storage(spacy_data, llm_data)
+    structured.update({
+        "username": username,
+        "pdfText": raw_text,
+        # Kept so reprocessing sees the same sections as the upload did
+        "section_spans": [[header, lines] for header, lines in section_spans] if section_spans else None,
+        "resumePdf": binary.Binary(file_buffer),
+        "llm_raw": llm_data,
+        "llm_usage": llm_usage,
+        "parser_version": PARSER_VERSION,
+        "prompt_version": PROMPT_VERSION,
+        "processing_status": "complete",
+        "created_at": datetime.datetime.utcnow(),
+        "updated_at": datetime.datetime.utcnow()
+    })
+    return add_search_terms(structured)
+
+def extract_stage(result: PipelineResult) -> Dict:
+    raw_text, section_spans = extract_document(result.file_path, result.file_type)
+    raw_text = safe_join_list(raw_text) if isinstance(raw_text, list) else raw_text
+    return {"text": raw_text, "sections": section_spans}
+
+def ner_stage(result: PipelineResult) -> Dict:
+    return extract_data_spacy_regex(result.text, result.sections)
+
+async def llm_stage(result: PipelineResult) -> Dict:
+    llm_data, llm_usage = await extract_data_llm(preprocess_text(result.text), stage=result.meta.get("llm_stage", "upload"))
+    result.meta["llm_usage"] = llm_usage
+    return llm_data
+
+def store_stage(result: PipelineResult) -> Dict:
+    username = result.key
+    structured = build_profile_document(
+        username, result.text, result.file_buffer, result.output("ner"), result.output("llm"), result.meta.get("llm_usage"),
+        result.sections
+    )
+    full_ms = result.elapsed_ms
+    fast_path_ms = result.meta.get("fast_path_ms")
+    structured["timings"] = {"fast_path_ms": fast_path_ms, "full_ms": full_ms, "stages": dict(result.timings)}
+    annotate(full_ms=full_ms)
+    logger.info(f"Full pass for {username} took {full_ms} ms (fast path {fast_path_ms} ms)")
+    
+    profile_collection.update_one(
+        {"username": username},
+        {"$set": structured, "$unset": {"processing_error": "", "processing_stage": ""}},
+        upsert=True
+    )
+    if search_index.loaded:
+        search_index.add(username, structured["search_terms"])
+    profile_cache.invalidate(username)
+    return structured
+
+def build_resume_pipeline() -> Pipeline:
+    """
+    extract -> (NER || LLM) -> store. NER runs on the pipeline thread pool
+    while the LLM request is in flight; stages in PIPELINE_CACHE_STAGES are
+    cached by file hash, so a re-upload of the same file skips them.
+    """
+    executor = ThreadPoolExecutor(max_workers=app.config["PIPELINE_WORKERS"], thread_name_prefix="pipeline")
+    cache = LRUCache(app.config["PIPELINE_CACHE_ENTRIES"])
+    cached = set(app.config["PIPELINE_CACHE_STAGES"]) - {"store"}
+    
+    def stage(name, backend):
+        return Stage(name, backend, executor=executor, cache=cache if name in cached else None)
+    
+    return Pipeline([
+        stage("extract", extract_stage),
+        [stage("ner", ner_stage), stage("llm", llm_stage)],
+        stage("store", store_stage)
+    ])
+
+resume_pipeline = build_resume_pipeline()
+
+async def process_resume(username: str, file_path: str, file_type: str, file_buffer: bytes,
+                         fast_path_ms: Optional[float] = None) -> Tuple[str, Dict]:
+    """Full-document pass: every page, sections, LLM, then upsert. Returns (raw_text, stored document)."""
+    result = PipelineResult(file_path, file_type, key=username, file_buffer=file_buffer, meta={"fast_path_ms": fast_path_ms})
+    await resume_pipeline.run(result)
+    return result.text, result.output("store")
+
+def process_resume_in_background(username: str, file_path: str, file_type: str, file_buffer: bytes, fast_path_ms: float):
+    try:
+        asyncio.run(process_resume(username, file_path, file_type, file_buffer, fast_path_ms))
+    except Exception as e:
+        stage = e.stage if isinstance(e, PipelineError) else None
+        logger.error(f"Background processing failed for {username} (stage {stage}): {e}")
+        profile_collection.update_one(
+            {"username": username},
+            {"$set": {
+                "processing_status": "failed",
+                "processing_error": str(e),
+                "processing_stage": stage,
+                "updated_at": datetime.datetime.utcnow()
+            }}
+        )
+        profile_cache.invalidate(username)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+def is_admin_request() -> bool:
+    token = app.config["ADMIN_TOKEN"]
+    return bool(token) and request.headers.get("X-Admin-Token") == token
+
+def profiled_view(name: str):
+    """
+    Profile a view when the request is sampled (PROFILE_SAMPLE_RATE) or an
+    admin sends `X-Profile: 1`. Unsampled requests pay only the coin flip.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            forced = request.headers.get("X-Profile") == "1" and is_admin_request()
+            if not should_profile(app.config["PROFILE_SAMPLE_RATE"], forced):
+                return await view(*args, **kwargs)
+            with ProfileCapture(name, profile_store, interval=app.config["PROFILE_INTERVAL_SECONDS"]):
+                return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 @app.route("/api/upload", methods=["POST"])
+@profiled_view("upload_resume")
 async def upload_resume():
     file_path = None
     try:
@@ -486,46 +818,45 @@ async def upload_resume():
         file_buffer = file.read()
         if len(file_buffer) > app.config["MAX_CONTENT_LENGTH"]:
             return jsonify({"error": "File size exceeds 5MB limit"}), 400
+        annotate(file_sha256=hashlib.sha256(file_buffer).hexdigest(), file_size=len(file_buffer), mimetype=file.mimetype)
         file.seek(0)
         
-        filename = secure_filename(file.filename)
+        # Unique name: a background pass may still be reading an earlier upload of the same file
+        filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
         file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
         file.save(file_path)
         
-        raw_text = extract_text_from_file(file_path, file.mimetype)
-        raw_text = safe_join_list(raw_text) if isinstance(raw_text, list) else raw_text
-        
-        spacy_data = extract_data_spacy_regex(raw_text)
-        if "error" in spacy_data:
-            raise Exception(spacy_data["error"])
-        
-        llm_data = await extract_data_llm(preprocess_text(raw_text))
-        if "error" in llm_data:
-            raise Exception(llm_data["error"])
+        if (request.form.get("mode") or request.args.get("mode")) == "fast":
+            # Phase 1: contact card from page one, persisted before the rest of the document is read
+            started = time.perf_counter()
+            card = extract_contact_card(file_path, file.mimetype)
+            save_contact_card(username, card)
+            fast_path_ms = round((time.perf_counter() - started) * 1000, 2)
+            annotate(fast_path_ms=fast_path_ms)
+            logger.info(f"Fast path for {username} took {fast_path_ms} ms")
+            background_executor.submit(
+                process_resume_in_background, username, file_path, file.mimetype, file_buffer, fast_path_ms
+            )
+            file_path = None  # owned by the background job now
+            return jsonify({
+                "message": "Contact details saved; full resume is processing",
+                "processing_status": "processing",
+                "data": card,
+                "timings": {"fast_path_ms": fast_path_ms}
+            }), 202
         
-        structured = structure_resume_for_storage(spacy_data, llm_data)
-        structured.update({
-            "username": username,
-            "pdfText": raw_text,
-            "resumePdf": binary.Binary(file_buffer),
-            "created_at": datetime.datetime.utcnow(),
-            "updated_at": datetime.datetime.utcnow()
-        })
-        
-        profile_collection.update_one(
-            {"username": username},
-            {"$set": structured},
-            upsert=True
-        )
+        # Inline: nothing is written until the full pass stores the profile, so a failure leaves the old one intact
+        raw_text, structured = await process_resume(username, file_path, file.mimetype, file_buffer)
         
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
         
-        filtered_structured = {k: v for k, v in structured.items() if k != "resumePdf"}
+        filtered_structured = {k: v for k, v in structured.items() if k not in ("resumePdf", "section_spans", "llm_raw", "llm_usage")}
         return jsonify({
             "message": "Resume uploaded and processed successfully",
             "pdfText": raw_text,
-            "data": filtered_structured
+            "data": filtered_structured,
+            "timings": structured["timings"]
         })
     
     except Exception as e:
@@ -534,9 +865,386 @@ async def upload_resume():
             os.remove(file_path)
         return jsonify({"error": f"Failed to upload resume: {str(e)}"}), 500
 
+SEARCH_EXCLUDED_FIELDS = {"pdfText", "resumePdf", "section_spans", "llm_usage", "_id"}
+SEARCH_DEFAULT_FIELDS = ["username", "name", "email", "state", "skills", "certifications", "updated_at"]
+
+def search_projection(fields_param: Optional[str]) -> Dict:
+    fields = [f.strip() for f in fields_param.split(",") if f.strip()] if fields_param else SEARCH_DEFAULT_FIELDS
+    projection = {f: 1 for f in fields if f not in SEARCH_EXCLUDED_FIELDS}
+    projection["username"] = 1
+    projection["_id"] = 0
+    return projection
+
+@app.route("/api/search", methods=["GET"])
+def search_profiles():
+    """
+    Search parsed profiles by skill, state and certification.
+
+    Query params: skill, state, cert (repeatable), exclude_skill (repeatable),
+    mode=all|any (boolean AND or ranked by number of matched terms),
+    q (free text, served by the Mongo text index), page, per_page, fields.
+    """
+    started = time.perf_counter()
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", 20)), 1), app.config["SEARCH_MAX_PER_PAGE"])
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+    
+    mode = request.args.get("mode", "all")
+    if mode not in ("all", "any"):
+        return jsonify({"error": "mode must be 'all' or 'any'"}), 400
+    
+    terms = query_terms(request.args.getlist("skill"), request.args.getlist("state"), request.args.getlist("cert"))
+    excluded = query_terms(request.args.getlist("exclude_skill"))
+    text = request.args.get("q")
+    if not terms and not text:
+        return jsonify({"error": "At least one of skill, state, cert or q is required"}), 400
+    
+    projection = search_projection(request.args.get("fields"))
+    offset = (page - 1) * per_page
+    
+    try:
+        if search_index.loaded:
+            sync_index(search_index, profile_collection, app.config["SEARCH_INDEX_REFRESH_SECONDS"], blocking=False)
+        if text or not search_index.loaded:
+            # Free-text queries go straight to Mongo; the posting lists only hold exact terms.
+            # Term queries also do until the background load has finished (unranked then).
+            all_of, any_of = (terms, []) if mode == "all" else ([], terms)
+            conditions = mongo_filter(all_of, any_of, excluded, text)
+            total = profile_collection.count_documents(conditions)
+            if text:
+                cursor = profile_collection.find(conditions, {**projection, "score": {"$meta": "textScore"}})
+                cursor = cursor.sort([("score", {"$meta": "textScore"})])
+            else:
+                cursor = profile_collection.find(conditions, projection).sort("updated_at", -1)
+            results = list(cursor.skip(offset).limit(per_page))
+        else:
+            if mode == "all":
+                matched = search_index.match(all_of=terms, none_of=excluded)
+                groups = [(len(terms), matched)] if matched else []
+            else:
+                matched = search_index.match(any_of=terms, none_of=excluded)
+                groups = search_index.ranked(terms, matched)
+            total = search_index.count(matched)
+            hits = search_index.page(groups, offset, per_page)
+            scores = dict(hits)
+            docs = {
+                doc["username"]: doc
+                for doc in profile_collection.find({"username": {"$in": list(scores)}}, projection)
+            }
+            results = []
+            for username, score in hits:
+                if username in docs:
+                    results.append({**docs[username], "score": score})
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+    
+    return jsonify({
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    })
+
+PROFILE_HIDDEN_FIELDS = {"pdfText", "resumePdf", "section_spans", "llm_raw", "llm_usage", "search_terms"}
+PROFILE_NEVER_FIELDS = {"_id"}
+
+def profile_etag(username: str, updated_at, fields_key: str) -> str:
+    stamp = updated_at.isoformat() if isinstance(updated_at, datetime.datetime) else str(updated_at)
+    return '"' + hashlib.sha1(f"{username}|{stamp}|{fields_key}".encode("utf-8")).hexdigest() + '"'
+
+def etag_matches(etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+def negotiate_encoding() -> Optional[str]:
+    accepted = request.headers.get("Accept-Encoding", "").lower()
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def profile_response(entry: Dict):
+    headers = {
+        "ETag": entry["etag"],
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if etag_matches(entry["etag"]):
+        return app.response_class(status=304, headers=headers)
+    body = entry["body"]
+    encoding = negotiate_encoding() if len(body) >= app.config["COMPRESS_MIN_BYTES"] else None
+    if encoding:
+        # Compressed variants are built once per cache entry and reused
+        if encoding not in entry:
+            entry[encoding] = brotli.compress(body, quality=5) if encoding == "br" else gzip.compress(body, compresslevel=6)
+        body = entry[encoding]
+        headers["Content-Encoding"] = encoding
+    return app.response_class(body, mimetype="application/json", headers=headers)
+
+@app.route("/api/profile/<username>", methods=["GET"])
+def get_profile(username):
+    """
+    Read a stored profile. `fields` selects a projection; pdfText, resumePdf
+    and other internal fields are left out unless asked for by name.
+    Responses carry an ETag derived from `updated_at` and are gzip/brotli
+    compressed when the client accepts it.
+    """
+    fields_param = request.args.get("fields")
+    if fields_param:
+        fields = sorted({f.strip() for f in fields_param.split(",") if f.strip()} - PROFILE_NEVER_FIELDS)
+        projection = {f: 1 for f in fields}
+        projection.update({"_id": 0, "updated_at": 1})
+        fields_key = ",".join(fields)
+    else:
+        projection = {f: 0 for f in PROFILE_HIDDEN_FIELDS | PROFILE_NEVER_FIELDS}
+        fields_key = "default"
+    
+    entry = profile_cache.get(username, fields_key)
+    if entry is not None and time.monotonic() - entry["cached_at"] < app.config["PROFILE_CACHE_TTL_SECONDS"]:
+        return profile_response(entry)
+    
+    # An upsert landing between the read and the cache write bumps this, so the stale body is not cached
+    generation = profile_cache.generation(username)
+    try:
+        if request.headers.get("If-None-Match"):
+            # Revalidation only needs updated_at; skip loading the document if the client copy is current
+            stamp = profile_collection.find_one({"username": username}, {"_id": 0, "updated_at": 1})
+            if stamp is None:
+                return jsonify({"error": "Profile not found"}), 404
+            etag = profile_etag(username, stamp.get("updated_at"), fields_key)
+            if etag_matches(etag):
+                return app.response_class(status=304, headers={"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"})
+        doc = profile_collection.find_one({"username": username}, projection)
+    except Exception as e:
+        logger.error(f"Profile read error: {e}")
+        return jsonify({"error": f"Failed to read profile: {str(e)}"}), 500
+    if doc is None:
+        return jsonify({"error": "Profile not found"}), 404
+    
+    updated_at = doc.get("updated_at")
+    if fields_param and "updated_at" not in fields_key.split(","):
+        doc.pop("updated_at", None)
+    entry = {
+        "etag": profile_etag(username, updated_at, fields_key),
+        "body": app.json.dumps({"data": doc}).encode("utf-8"),
+        "cached_at": time.monotonic()
+    }
+    profile_cache.set(username, fields_key, entry, generation=generation)
+    return profile_response(entry)
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        limit = min(int(request.args.get("limit", 20)), 200)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"profiles": profile_store.slowest(limit)})
+
+@app.route("/api/admin/profiles/<capture_id>", methods=["GET"])
+def get_profile_capture(capture_id):
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    folded = profile_store.folded(capture_id)
+    if folded is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return app.response_class(folded, mimetype="text/plain")
+
+@app.route("/api/admin/llm-metrics", methods=["GET"])
+def get_llm_metrics():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(llm_metrics.snapshot())
+
+@app.route("/api/admin/pipeline-metrics", methods=["GET"])
+def get_pipeline_metrics():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(resume_pipeline.metrics.snapshot())
+
+@app.route("/api/admin/export", methods=["GET"])
+def export_profiles_jsonl():
+    """
+    Stream flattened profiles as JSONL, oldest `updated_at` first. Pass the
+    last row's updated_at back as `since` for an incremental export.
+    Parquet needs a seekable file, so it is only offered by the CLI.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.args.get("format", "jsonl") != "jsonl":
+        return jsonify({"error": "Only format=jsonl can be streamed; use `python app.py export` for parquet"}), 400
+    since = None
+    if request.args.get("since"):
+        try:
+            since = datetime.datetime.fromisoformat(request.args["since"].rstrip("Z"))
+        except ValueError:
+            return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+    rows = (flatten_profile(doc) for doc in iter_profiles(profile_collection, since))
+    return Response(stream_with_context(jsonl_lines(rows)), mimetype="application/x-ndjson")
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     return send_from_directory(app.static_folder, filename)
 
+def reprocess_profiles(args):
+    async def llm_stage(text: str) -> Tuple[Dict, Dict]:
+        return await extract_data_llm(preprocess_text(text), stage="reprocess")
+    
+    def segment(resume_pdf: bytes) -> Optional[List[Tuple[str, List[str]]]]:
+        # Profiles stored before section spans were kept: re-read the headers from the PDF
+        try:
+            return segment_pdf(io.BytesIO(resume_pdf), known_headers=KNOWN_SECTION_HEADERS)["sections"] or None
+        except Exception as e:
+            logger.warning(f"Layout segmentation failed during reprocess: {e}")
+            return None
+    
+    engine = ReprocessEngine(
+        profile_collection,
+        targets={"schema_version": SCHEMA_VERSION, "parser_version": PARSER_VERSION, "prompt_version": PROMPT_VERSION},
+        ner=extract_data_spacy_regex,
+        llm=llm_stage,
+        structure=structure_resume_for_storage,
+        enrich=add_search_terms,
+        segment=segment,
+        structured_fields=STRUCTURED_FIELDS,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        llm_rate=args.llm_rate,
+        batch_pause=args.batch_pause,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run
+    )
+    stats = asyncio.run(engine.run(limit=args.limit))
+    logger.info(f"Reprocess finished: {stats}")
+
+MIMETYPES_BY_EXTENSION = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+}
+
+def import_resumes(args):
+    """
+    Offline import: extract and run spaCy locally, then send the LLM stage
+    for each chunk of files as one batch job. Usernames are the file stems.
+    """
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                paths.append(os.path.join(path, name))
+        else:
+            paths.append(path)
+    paths = [p for p in paths if os.path.splitext(p)[1].lower() in MIMETYPES_BY_EXTENSION]
+    
+    async def prepare(path: str) -> PipelineResult:
+        with open(path, "rb") as f:
+            file_buffer = f.read()
+        result = PipelineResult(
+            path,
+            MIMETYPES_BY_EXTENSION[os.path.splitext(path)[1].lower()],
+            key=os.path.splitext(os.path.basename(path))[0],
+            file_buffer=file_buffer
+        )
+        return await resume_pipeline.run(result, only=["extract", "ner"])
+    
+    async def prepare_chunk(chunk: List[str]) -> List:
+        return await asyncio.gather(*(prepare(path) for path in chunk), return_exceptions=True)
+    
+    imported = failed = 0
+    sources = {}
+    for start in range(0, len(paths), args.chunk_size):
+        # Extraction and NER for the whole chunk run concurrently on the pipeline thread pool
+        chunk = paths[start:start + args.chunk_size]
+        prepared = {}
+        for path, outcome in zip(chunk, asyncio.run(prepare_chunk(chunk))):
+            if isinstance(outcome, Exception):
+                failed += 1
+                logger.error(f"Import failed for {path}: {outcome}")
+            elif outcome.key in sources:
+                # Same file stem in two directories would overwrite one profile with the other
+                failed += 1
+                logger.error(f"Import failed for {path}: username {outcome.key} already used by {sources[outcome.key]}")
+            else:
+                sources[outcome.key] = path
+                prepared[outcome.key] = outcome
+        
+        llm_results = asyncio.run(extract_data_llm_bulk({u: preprocess_text(r.text) for u, r in prepared.items()}))
+        operations = []
+        for username, result in prepared.items():
+            llm_data, llm_usage = llm_results.get(username, ({"error": "Missing batch result"}, None))
+            if "error" in llm_data:
+                failed += 1
+                logger.error(f"Import failed for {username}: {llm_data['error']}")
+                continue
+            structured = build_profile_document(
+                username, result.text, result.file_buffer, result.output("ner"), llm_data, llm_usage, result.sections
+            )
+            operations.append(pymongo.UpdateOne({"username": username}, {"$set": structured}, upsert=True))
+            profile_cache.invalidate(username)
+        if operations:
+            profile_collection.bulk_write(operations, ordered=False)
+            imported += len(operations)
+        logger.info(f"LLM usage so far: {llm_metrics.snapshot()['totals']}; pipeline: {resume_pipeline.metrics.snapshot()}")
+        logger.info(f"Imported {imported} resumes, {failed} failed ({min(start + args.chunk_size, len(paths))}/{len(paths)} files read)")
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Resume parser server and maintenance commands")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="Run the development server (default)")
+    reprocess_cmd = commands.add_parser("reprocess", help="Re-run stale parsing stages on stored profiles")
+    reprocess_cmd.add_argument("--batch-size", type=int, default=100)
+    reprocess_cmd.add_argument("--concurrency", type=int, default=4)
+    reprocess_cmd.add_argument("--llm-rate", type=float, default=1.0, help="Max LLM requests per second")
+    reprocess_cmd.add_argument("--batch-pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    reprocess_cmd.add_argument("--checkpoint", default=os.path.join(BASE_DIR, "reprocess_checkpoint.json"))
+    reprocess_cmd.add_argument("--limit", type=int, default=None)
+    reprocess_cmd.add_argument("--dry-run", action="store_true")
+    import_cmd = commands.add_parser("import", help="Bulk import resume files using batched LLM extraction")
+    import_cmd.add_argument("paths", nargs="+", help="Resume files or directories")
+    import_cmd.add_argument("--chunk-size", type=int, default=500, help="Files per batch job")
+    export_cmd = commands.add_parser("export", help="Stream flattened profiles to JSONL or Parquet")
+    export_cmd.add_argument("--out", required=True)
+    export_cmd.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    export_cmd.add_argument("--since", help="Only profiles updated after this ISO timestamp")
+    export_cmd.add_argument("--state-file", help="Read/write the updated_at watermark for incremental exports")
+    export_cmd.add_argument("--batch-size", type=int, default=1000, help="Mongo cursor batch size")
+    export_cmd.add_argument("--row-group-size", type=int, default=10000, help="Rows per Parquet row group")
+    report_cmd = commands.add_parser("llm-report", help="Relate LLM input size, truncation and latency from stored usage")
+    report_cmd.add_argument("--since", help="Only calls made after this ISO timestamp")
+    report_cmd.add_argument("--mode", choices=["interactive", "batch", "all"], default="interactive")
+    report_cmd.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    
+    if args.command == "reprocess":
+        reprocess_profiles(args)
+    elif args.command == "import":
+        import_resumes(args)
+    elif args.command == "export":
+        export_profiles(
+            profile_collection,
+            args.out,
+            fmt=args.format,
+            since=datetime.datetime.fromisoformat(args.since.rstrip("Z")) if args.since else None,
+            state_file=args.state_file,
+            batch_size=args.batch_size,
+            row_group_size=args.row_group_size
+        )
+    elif args.command == "llm-report":
+        report = usage_report(
+            iter_usage(
+                profile_collection,
+                since=datetime.datetime.fromisoformat(args.since.rstrip("Z")) if args.since else None,
+                mode=None if args.mode == "all" else args.mode
+            ),
+            LLM_MAX_INPUT_CHARS
+        )
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
+    else:
+        app.run(debug=True, port=5000)
\ No newline at end of file
@@ -24,8 +24,16 @@ def create_app():
             SECRET_KEY="your-secret-key",
             MONGO_URI="mongodb://localhost:27017/resume_parser",
             HUGGINGFACE_API_KEY=None,
+            LOCAL_QA_MODEL_DIR="data/models/resume_parser_model",
             UPLOAD_FOLDER="app/static/uploads",
-            ALLOWED_EXTENSIONS={".pdf", ".docx"}
+            ALLOWED_EXTENSIONS={".pdf", ".docx"},
+            ADMIN_TOKEN=None,
+            PIPELINE_WORKERS=4,
+            PIPELINE_CACHE_ENTRIES=256,
+            PIPELINE_CACHE_STAGES=["extract"],
+            PROFILE_SAMPLE_RATE=0.0,
+            PROFILE_INTERVAL_SECONDS=0.005,
+            PROFILE_DIR="data/profiles"
         )
         print("Using fallback configuration")
     
@@ -43,6 +51,14 @@ def create_app():
     print("Template folder exists:", os.path.exists(template_folder))
     print("index.html exists:", os.path.exists(os.path.join(template_folder, "index.html")))
     
+    # Recent request profiles for the /admin/profiles endpoint
+    from .utils.profiling import ProfileStore
+    app.extensions["profile_store"] = ProfileStore(app.config["PROFILE_DIR"])
+    
+    # extract -> qa -> store on the shared pipeline engine
+    from .models.resume_pipeline import build_resume_pipeline
+    app.extensions["resume_pipeline"] = build_resume_pipeline(app.config)
+    
     # Register blueprints
     from .routes import main
     app.register_blueprint(main)
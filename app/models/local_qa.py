@@ -0,0 +1,63 @@
+import os
+import threading
+import logging
+from typing import Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUANTIZED_WEIGHTS = "quantized_state_dict.pt"
+
+_models: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def quantize(model):
+    """Dynamic int8 quantization of every Linear layer; activations stay float, so it runs on any CPU."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def save_quantized(model, tokenizer, out_dir: str) -> str:
+    """
+    Export a fine-tuned QA model as config + tokenizer + int8 state dict.
+    Only the quantized weights are written; `load_quantized` rebuilds the
+    architecture from the config and quantizes it before loading them.
+    """
+    import torch
+    os.makedirs(out_dir, exist_ok=True)
+    model.config.save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+    path = os.path.join(out_dir, QUANTIZED_WEIGHTS)
+    torch.save(quantize(model.eval()).state_dict(), path)
+    return path
+
+
+def load_quantized(model_dir: str):
+    import torch
+    from transformers import AutoConfig, AutoModelForQuestionAnswering, AutoTokenizer, pipeline
+    config = AutoConfig.from_pretrained(model_dir)
+    model = quantize(AutoModelForQuestionAnswering.from_config(config).eval())
+    model.load_state_dict(torch.load(os.path.join(model_dir, QUANTIZED_WEIGHTS), map_location="cpu"))
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline("question-answering", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_local_qa(model_dir: Optional[str]):
+    """
+    Question-answering pipeline over the exported model in `model_dir`, loaded
+    once per process. Returns None when no model has been exported there or
+    torch/transformers are not installed, so callers can fall back to the API.
+    """
+    if not model_dir or not os.path.exists(os.path.join(model_dir, QUANTIZED_WEIGHTS)):
+        return None
+    with _lock:
+        if model_dir not in _models:
+            try:
+                _models[model_dir] = load_quantized(model_dir)
+                logger.info(f"Loaded local QA model from {model_dir}")
+            except Exception as e:
+                logger.error(f"Failed to load local QA model from {model_dir}: {e}")
+                _models[model_dir] = None
+        return _models[model_dir]
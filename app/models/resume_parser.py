@@ -2,16 +2,44 @@ import requests
 from config import Config
 import re
 import logging
+from ..utils.profiling import profile_stage
+from .local_qa import load_local_qa
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def parse_resume(resume_text):
-    if not resume_text or not resume_text.strip():
-        logger.error("Empty or invalid resume text provided")
-        return {"error": "No text extracted from resume"}
-    
+QA_QUESTIONS = {
+    "Name": "Who is the person named in the resume?",
+    "Email": "What is the email address listed in the resume?",
+    "State": "Which state is mentioned in the address?",
+    "Address": "What is the full address?",
+    "Education": "What is the educational background?",
+    "Skills": "What skills are listed?",
+    "Technical Skills": "What technical skills are listed?",
+    "Experience": "What is the work experience history?",
+    "Certifications": "What certifications are listed?"
+}
+
+# The local model windows long inputs itself, so it can read further than the API's 2000 chars
+LOCAL_CONTEXT_CHARS = 8000
+API_CONTEXT_CHARS = 2000
+
+def parse_with_local_model(qa, resume_text):
+    parsed_data = {}
+    context = resume_text[:LOCAL_CONTEXT_CHARS]
+    for section, question in QA_QUESTIONS.items():
+        try:
+            result = qa(question=question, context=context, handle_impossible_answer=True)
+            score = result.get("score", 0)
+            parsed_data[section] = (result.get("answer") or None) if score > 0.0001 else None
+            logger.info(f"{section} score (local): {score}, answer: {parsed_data[section]}")
+        except Exception as e:
+            logger.error(f"Local model exception for {section}: {str(e)}")
+            parsed_data[section] = None
+    return parsed_data
+
+def parse_with_api(resume_text):
     models = [
         "deepset/roberta-base-squad2",
         "bert-large-uncased-whole-word-masking-finetuned-squad"
@@ -22,18 +50,6 @@ def parse_resume(resume_text):
         logger.error("Invalid or missing Hugging Face API key")
         return {"error": "Invalid or missing Hugging Face API key"}
     
-    questions = {
-        "Name": "Who is the person named in the resume?",
-        "Email": "What is the email address listed in the resume?",
-        "State": "Which state is mentioned in the address?",
-        "Address": "What is the full address?",
-        "Education": "What is the educational background?",
-        "Skills": "What skills are listed?",
-        "Technical Skills": "What technical skills are listed?",
-        "Experience": "What is the work experience history?",
-        "Certifications": "What certifications are listed?"
-    }
-    
     parsed_data = {}
     
     for model in models:
@@ -41,13 +57,13 @@ def parse_resume(resume_text):
         logger.info(f"Attempting to parse with model: {model}")
         success = True
         
-        for section, question in questions.items():
+        for section, question in QA_QUESTIONS.items():
             if section in parsed_data and parsed_data[section]:
                 continue  # Skip if already parsed
             payload = {
                 "inputs": {
                     "question": question,
-                    "context": resume_text[:2000]  # Increased context
+                    "context": resume_text[:API_CONTEXT_CHARS]
                 }
             }
             try:
@@ -76,6 +92,20 @@ def parse_resume(resume_text):
         if success:
             break
     
+    return parsed_data
+
+@profile_stage()
+def parse_resume(resume_text):
+    if not resume_text or not resume_text.strip():
+        logger.error("Empty or invalid resume text provided")
+        return {"error": "No text extracted from resume"}
+    
+    # A model exported by scripts/fine_tune_model.py replaces the per-request API calls
+    qa = load_local_qa(Config.LOCAL_QA_MODEL_DIR)
+    parsed_data = parse_with_local_model(qa, resume_text) if qa is not None else parse_with_api(resume_text)
+    if "error" in parsed_data:
+        return parsed_data
+    
     if not any(parsed_data.values()):
         logger.warning("No data parsed; trying regex fallback")
         parsed_data["Email"] = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", resume_text)
@@ -0,0 +1,49 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.cache import LRUCache
+from ..utils.file_processor import extract_text_from_file
+from ..utils.pipeline import Pipeline, PipelineResult, Stage
+from .resume_parser import parse_resume
+from .db_models import save_resume_to_db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def extract_backend(result: PipelineResult):
+    text = extract_text_from_file(result.file_path)
+    logger.info(f"Extracted resume text length: {len(text)}")
+    return {"text": text, "sections": None}
+
+
+def qa_backend(result: PipelineResult):
+    return parse_resume(result.text)
+
+
+def store_backend(result: PipelineResult):
+    resume_id = save_resume_to_db(result.output("qa"), result.key or os.path.basename(result.file_path))
+    logger.info(f"Saved resume ID: {resume_id}")
+    return resume_id
+
+
+def build_resume_pipeline(config) -> Pipeline:
+    """
+    extract -> qa -> store for the app/ blueprint, on the same engine as
+    app.py. Every stage runs on a shared thread pool. Stages listed in
+    PIPELINE_CACHE_STAGES are cached by file hash; storage never is.
+    """
+    executor = ThreadPoolExecutor(max_workers=config.get("PIPELINE_WORKERS", 4), thread_name_prefix="pipeline")
+    cache = LRUCache(config.get("PIPELINE_CACHE_ENTRIES", 256))
+    cached = set(config.get("PIPELINE_CACHE_STAGES", ["extract"])) - {"store"}
+
+    def stage(name, backend):
+        return Stage(name, backend, executor=executor, cache=cache if name in cached else None)
+
+    return Pipeline([
+        stage("extract", extract_backend),
+        stage("qa", qa_backend),
+        stage("store", store_backend)
+    ])
@@ -1,9 +1,12 @@
-from flask import Blueprint, render_template, request, current_app
+from flask import Blueprint, render_template, request, current_app, jsonify
 from werkzeug.utils import secure_filename
 import os
 import sys
 import json
+import hashlib
+import functools
 import logging
+from .utils.profiling import ProfileCapture, annotate, is_capturing, should_profile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,28 +17,38 @@ main = Blueprint("main", __name__)
 print("sys.path in routes.py:", sys.path)
 print("Current directory:", os.getcwd())
 print("Checking for app/utils/__init__.py:", os.path.exists(os.path.join(os.path.dirname(__file__), "utils", "__init__.py")))
-print("Checking for app/utils/file_processor.py:", os.path.exists(os.path.join(os.path.dirname(__file__), "utils", "file_processor.py")))
 
+# Extraction, parsing and storage live in app/models/resume_pipeline.py
 try:
-    from .utils.file_processor import extract_text_from_file
-    print("Successfully imported extract_text_from_file")
+    from .utils.pipeline import PipelineError, PipelineResult
+    print("Successfully imported pipeline")
 except ImportError as e:
-    print(f"Failed to import utils.file_processor: {e}")
+    print(f"Failed to import utils.pipeline: {e}")
     raise
 
-try:
-    from .models.resume_parser import parse_resume
-    from .models.db_models import save_resume_to_db
-    print("Successfully imported models")
-except ImportError as e:
-    print(f"Failed to import models: {e}")
-    raise
+def is_admin_request():
+    token = current_app.config.get("ADMIN_TOKEN")
+    return bool(token) and request.headers.get("X-Admin-Token") == token
+
+def profiled_view(name):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            forced = request.headers.get("X-Profile") == "1" and is_admin_request()
+            if not should_profile(current_app.config.get("PROFILE_SAMPLE_RATE", 0), forced):
+                return view(*args, **kwargs)
+            store = current_app.extensions["profile_store"]
+            with ProfileCapture(name, store, interval=current_app.config.get("PROFILE_INTERVAL_SECONDS", 0.005)):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
 
 @main.route("/", methods=["GET"])
 def index():
     return render_template("index.html")
 
 @main.route("/upload_resume", methods=["POST"])
+@profiled_view("upload_resume")
 def upload_resume():
     if "resume" not in request.files:
         logger.error("No file uploaded")
@@ -56,24 +69,26 @@ def upload_resume():
     try:
         file.save(upload_path)
         logger.info(f"Saved file to {upload_path}")
+        if is_capturing():
+            with open(upload_path, "rb") as f:
+                annotate(file_sha256=hashlib.sha256(f.read()).hexdigest())
         
-        resume_text = extract_text_from_file(upload_path)
-        logger.info(f"Extracted resume text length: {len(resume_text)}")
+        pipeline = current_app.extensions["resume_pipeline"]
+        try:
+            result = pipeline.run_sync(PipelineResult(upload_path, file_type=file.mimetype, key=filename))
+        except PipelineError as e:
+            logger.error(f"Pipeline error in {e.stage}: {e}")
+            return render_template("error.html", message=str(e)), 500
+        annotate(pipeline_ms=result.timings, pipeline_cached=result.cached)
         
         with open("extracted_resume_text.txt", "w", encoding="utf-8") as f:
-            f.write(resume_text)
+            f.write(result.text)
         logger.info("Saved extracted text to extracted_resume_text.txt")
         
-        parsed_data = parse_resume(resume_text)
+        parsed_data = result.output("qa")
+        resume_id = result.output("store")
         logger.info(f"Parsed data: {parsed_data}")
         
-        if "error" in parsed_data:
-            logger.error(f"Parsing error: {parsed_data['error']}")
-            return render_template("error.html", message=parsed_data["error"]), 500
-        
-        resume_id = save_resume_to_db(parsed_data, filename)
-        logger.info(f"Saved resume ID: {resume_id}")
-        
         formatted_data = json.dumps(parsed_data, indent=2) if parsed_data else "{}"
         logger.info(f"Formatted data: {formatted_data}")
         
@@ -84,4 +99,27 @@ def upload_resume():
     
     except Exception as e:
         logger.error(f"Error in upload_resume: {str(e)}")
-        return render_template("error.html", message=str(e)), 500
\ No newline at end of file
+        return render_template("error.html", message=str(e)), 500
+
+@main.route("/admin/pipeline", methods=["GET"])
+def pipeline_metrics():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(current_app.extensions["resume_pipeline"].metrics.snapshot())
+
+@main.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    store = current_app.extensions["profile_store"]
+    profile_id = request.args.get("id")
+    if profile_id:
+        folded = store.folded(profile_id)
+        if folded is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return current_app.response_class(folded, mimetype="text/plain")
+    try:
+        limit = min(int(request.args.get("limit", 20)), 200)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"profiles": store.slowest(limit)})
\ No newline at end of file
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-key-group invalidation. Keys are
+    (group, subkey) tuples so every cached variant of one profile
+    (different projections, encodings) can be dropped at once on upsert.
+
+    A reader that loads a value from the database should take
+    `generation(group)` first and pass it to `set`: if the group was
+    invalidated in between, the value may already be stale and is not cached.
+    Generations come from one counter; the oldest are forgotten past
+    `max_entries`, and a forgotten group reads as the newest forgotten value,
+    so a reader can only ever see a spurious change, never miss a real one.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._groups = {}
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._counter = 0
+        self._forgotten = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, group: Hashable, subkey: Hashable) -> Optional[Any]:
+        key = (group, subkey)
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, group: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(group, self._forgotten)
+
+    def set(self, group: Hashable, subkey: Hashable, value: Any, generation: Optional[int] = None):
+        key = (group, subkey)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(group, self._forgotten):
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._groups.setdefault(group, set()).add(subkey)
+            while len(self._data) > self.max_entries:
+                (old_group, old_subkey), _ = self._data.popitem(last=False)
+                subkeys = self._groups.get(old_group)
+                if subkeys is not None:
+                    subkeys.discard(old_subkey)
+                    if not subkeys:
+                        del self._groups[old_group]
+
+    def invalidate(self, group: Hashable):
+        with self._lock:
+            for subkey in self._groups.pop(group, ()):
+                self._data.pop((group, subkey), None)
+            self._counter += 1
+            self._generations[group] = self._counter
+            self._generations.move_to_end(group)
+            while len(self._generations) > self.max_entries:
+                _, self._forgotten = self._generations.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._groups.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,86 @@
+import re
+import logging
+from typing import Dict, List, Optional
+
+import validators
+
+from .safe_regex import MatchBudget, SafePattern
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGEX_BUDGET_SECONDS = 0.25
+# A line of a links section longer than this is prose or noise, not a link
+SOCIAL_LINE_MAX_CHARS = 500
+
+# Every pattern below is linear on the stdlib engine: quantifiers are bounded
+# or run over a single token, and the leading lookbehind stops a match from
+# being retried at every offset inside a long run of word characters.
+EMAIL_PATTERN = r"(?<![\w.%+-])[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9-]{1,63}(?:\.[a-zA-Z0-9-]{1,63}){0,8}\.[a-zA-Z]{2,24}"
+PHONE_PATTERN = r"(?<![\d])(?:\+?\d{1,3})?[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?:\s?(?:x|ext\.?)\s?\d{1,5})?(?!\d)"
+SOCIAL_MEDIA_PATTERNS = {
+    "linkedin": r"(?<![\w.-])(?:https?://)?(?:www\.)?linkedin\.com/(?:in|pub|company)/[a-zA-Z0-9-]{1,100}/?",
+    "github": r"(?<![\w.-])(?:https?://)?(?:www\.)?github\.com/[a-zA-Z0-9-]{1,39}/?",
+    "twitter": r"(?<![\w.-])(?:https?://)?(?:www\.)?(?:twitter\.com|x\.com)/[a-zA-Z0-9_]{1,15}/?",
+    # The '@' and '/' guards also keep e-mail domains and URL paths out of the portfolio candidates
+    "portfolio": r"(?<![\w.@/-])(?:https?://)?(?:www\.)?[a-zA-Z0-9-]{1,63}\.[a-zA-Z]{2,24}/?(?:portfolio)?(?:/[a-zA-Z0-9-]{1,100})?/?",
+}
+
+
+def build_contact_patterns(states: List[str]) -> Dict[str, SafePattern]:
+    patterns = {
+        "email": SafePattern("email", EMAIL_PATTERN, re.IGNORECASE),
+        "phone": SafePattern("phone", PHONE_PATTERN),
+        "state": SafePattern("state", r"\b(?:" + "|".join(re.escape(s) for s in states) + r")\b", re.IGNORECASE),
+    }
+    for platform, pattern in SOCIAL_MEDIA_PATTERNS.items():
+        patterns[platform] = SafePattern(platform, pattern, re.IGNORECASE)
+    return patterns
+
+
+def is_valid_url(url: str) -> bool:
+    return bool(validators.url(url) or validators.url("https://" + url))
+
+
+def social_line_platforms(line: str, patterns: Dict[str, SafePattern], budget: Optional[MatchBudget] = None) -> List[str]:
+    """
+    Platforms a line from a links/social section points at, in
+    SOCIAL_MEDIA_PATTERNS order. A line mentioning 'portfolio' counts as a
+    portfolio link. Over-long lines match nothing, and all lines of a
+    document should share one `budget`.
+    """
+    if len(line) > SOCIAL_LINE_MAX_CHARS:
+        return []
+    platforms = []
+    for platform in SOCIAL_MEDIA_PATTERNS:
+        if platform == "portfolio" and "portfolio" in line.lower():
+            platforms.append(platform)
+        elif patterns[platform].search(line, budget) is not None:
+            platforms.append(platform)
+    return platforms
+
+
+def extract_regex_fields(text: str, patterns: Dict[str, SafePattern], budget: Optional[MatchBudget] = None) -> Dict:
+    """
+    Email, phone, state and social links from untrusted resume text. All
+    patterns share one `budget`; once it runs out the remaining fields are
+    left empty and the field names are listed in `budget.degraded`.
+    """
+    budget = budget or MatchBudget(DEFAULT_REGEX_BUDGET_SECONDS)
+    data = {}
+
+    data["email"] = patterns["email"].search(text, budget)
+    if data["email"] and not validators.email(data["email"]):
+        logger.warning(f"Invalid email format: {data['email']}")
+        data["email"] = None
+
+    data["phone"] = patterns["phone"].search(text, budget)
+    data["state"] = patterns["state"].search(text, budget)
+
+    data["social_media"] = {}
+    for platform in SOCIAL_MEDIA_PATTERNS:
+        url = patterns[platform].search(text, budget, accept=is_valid_url)
+        if url:
+            data["social_media"][platform] = url
+    return data
@@ -0,0 +1,197 @@
+import os
+import json
+import datetime
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Only what the flattener reads; pdfText, resumePdf and llm_raw never leave Mongo
+EXPORT_PROJECTION = {
+    "_id": 0, "username": 1, "name": 1, "email": 1, "phone": 1, "state": 1, "career_objective": 1,
+    "social_media": 1, "education": 1, "experience": 1, "skills": 1, "projects": 1,
+    "certifications": 1, "achievements": 1, "schema_version": 1, "parser_version": 1,
+    "prompt_version": 1, "created_at": 1, "updated_at": 1
+}
+
+STRING_COLUMNS = ["username", "name", "email", "phone", "state", "career_objective"]
+INT_COLUMNS = ["schema_version", "parser_version", "prompt_version", "education_count", "experience_count", "skill_count"]
+TIMESTAMP_COLUMNS = ["created_at", "updated_at"]
+LIST_COLUMNS = [
+    "social_other", "skills_technical", "skills_soft", "skills_languages", "skills_other",
+    "education_institution", "education_degree", "education_dates",
+    "experience_company", "experience_role", "experience_dates",
+    "project_names", "certification_names", "certification_issuers", "achievements"
+]
+SOCIAL_COLUMNS = ["social_linkedin", "social_github", "social_twitter", "social_portfolio"]
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value if v is not None) or None
+    return str(value)
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _entries(value) -> List[Dict]:
+    if not isinstance(value, list):
+        return []
+    return [e if isinstance(e, dict) else {"details": str(e)} for e in value]
+
+
+def _column(entries: List[Dict], key: str) -> List[str]:
+    return [str(e.get(key) or "") for e in entries]
+
+
+def flatten_profile(doc: Dict) -> Dict:
+    """
+    Flatten one structure_resume_for_storage document into a fixed set of
+    columns: scalars stay scalars, nested arrays of objects become parallel
+    list columns (education_institution[i] pairs with education_degree[i]).
+    """
+    social = doc.get("social_media") or {}
+    skills = doc.get("skills") or {}
+    education = _entries(doc.get("education"))
+    experience = _entries(doc.get("experience"))
+    certifications = _entries(doc.get("certifications"))
+    projects = _entries(doc.get("projects"))
+
+    row = {column: _text(doc.get(column)) for column in STRING_COLUMNS}
+    row.update({
+        "social_linkedin": _text(social.get("linkedin")),
+        "social_github": _text(social.get("github")),
+        "social_twitter": _text(social.get("twitter")),
+        "social_portfolio": _text(social.get("portfolio")),
+        "social_other": [str(v) for v in social.get("other") or []],
+        "skills_technical": [str(v) for v in skills.get("technical_skills") or []],
+        "skills_soft": [str(v) for v in skills.get("soft_skills") or []],
+        "skills_languages": [str(v) for v in skills.get("languages") or []],
+        "skills_other": [str(v) for v in skills.get("other_skills") or []],
+        "education_institution": _column(education, "institution"),
+        "education_degree": _column(education, "degree"),
+        "education_dates": _column(education, "dates"),
+        "experience_company": _column(experience, "company"),
+        "experience_role": _column(experience, "role"),
+        "experience_dates": _column(experience, "dates"),
+        "project_names": _column(projects, "name"),
+        "certification_names": _column(certifications, "name"),
+        "certification_issuers": _column(certifications, "issuer"),
+        "achievements": [str(v) for v in doc.get("achievements") or [] if v is not None],
+        "schema_version": _int(doc.get("schema_version")),
+        "parser_version": _int(doc.get("parser_version")),
+        "prompt_version": _int(doc.get("prompt_version")),
+        "education_count": len(education),
+        "experience_count": len(experience),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+    })
+    row["skill_count"] = sum(len(row[c]) for c in ("skills_technical", "skills_soft", "skills_languages", "skills_other"))
+    return row
+
+
+def iter_profiles(collection, since: Optional[datetime.datetime] = None, batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Stream profiles in `updated_at` order with a server-side projection, so
+    memory stays flat and the last row's `updated_at` is a valid watermark
+    for the next incremental export.
+    """
+    query = {"updated_at": {"$gt": since}} if since else {}
+    cursor = collection.find(query, EXPORT_PROJECTION).sort("updated_at", 1).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat() + ("Z" if value.tzinfo is None else "")
+    return str(value)
+
+
+def jsonl_lines(rows: Iterable[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def parquet_schema():
+    import pyarrow as pa
+    fields = [pa.field(c, pa.string()) for c in STRING_COLUMNS + SOCIAL_COLUMNS]
+    fields += [pa.field(c, pa.list_(pa.string())) for c in LIST_COLUMNS]
+    fields += [pa.field(c, pa.int32()) for c in INT_COLUMNS]
+    fields += [pa.field(c, pa.timestamp("ms")) for c in TIMESTAMP_COLUMNS]
+    return pa.schema(fields)
+
+
+def write_parquet(rows: Iterable[Dict], path: str, row_group_size: int = 10000) -> int:
+    """Write rows to Parquet one row group at a time; at most `row_group_size` rows are held in memory."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = parquet_schema()
+    count = 0
+    buffer: List[Dict] = []
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+                count += len(buffer)
+                buffer = []
+        if buffer:
+            writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+            count += len(buffer)
+    return count
+
+
+def export_profiles(collection, out_path: str, fmt: str = "jsonl", since: Optional[datetime.datetime] = None,
+                    state_file: Optional[str] = None, batch_size: int = 1000, row_group_size: int = 10000) -> Dict:
+    """
+    Export profiles changed after `since` (or after the watermark saved in
+    `state_file`) to JSONL or Parquet. The watermark is only advanced once
+    the output file has been fully written.
+    """
+    if since is None and state_file and os.path.exists(state_file):
+        with open(state_file, encoding="utf-8") as f:
+            saved = json.load(f).get("updated_at")
+        since = datetime.datetime.fromisoformat(saved) if saved else None
+
+    watermark = {"updated_at": since}
+
+    def rows():
+        for doc in iter_profiles(collection, since, batch_size):
+            if doc.get("updated_at"):
+                watermark["updated_at"] = doc["updated_at"]
+            yield flatten_profile(doc)
+
+    tmp_path = out_path + ".part"
+    if fmt == "parquet":
+        count = write_parquet(rows(), tmp_path, row_group_size)
+    elif fmt == "jsonl":
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for line in jsonl_lines(rows()):
+                f.write(line)
+                count += 1
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    os.replace(tmp_path, out_path)
+
+    if state_file and watermark["updated_at"]:
+        with open(state_file, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": watermark["updated_at"].isoformat()}, f)
+    logger.info(f"Exported {count} profiles to {out_path} (since {since}, watermark {watermark['updated_at']})")
+    return {"count": count, "since": since, "watermark": watermark["updated_at"]}
@@ -5,11 +5,13 @@ from PIL import Image
 import pytesseract
 from pdf2image import convert_from_path
 import logging
+from .profiling import profile_stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@profile_stage()
 def extract_text_from_file(file_path):
     """
     Extract text from PDF or DOCX files, with OCR fallback for complex PDFs.
@@ -0,0 +1,230 @@
+import re
+import logging
+import statistics
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pdfplumber
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BOLD_FONT_PATTERN = re.compile(r"bold|black|heavy|semibold|demi", re.IGNORECASE)
+LINE_Y_TOLERANCE = 3.0
+HEADER_SIZE_RATIO = 1.15
+MAX_HEADER_WORDS = 6
+MAX_HEADER_CHARS = 50
+# A gutter may be crossed by a few full-width lines (name banner, footer) and still count as one
+MAX_GUTTER_CROSSING_RATIO = 0.04
+MIN_COLUMN_SHARE = 0.15
+# Words either side of the gutter closer than this (in font sizes) are one full-width line
+MAX_WORD_GAP_RATIO = 1.0
+# A one-sided line further than this (in font sizes) from the next line of its
+# column, above or below the rows both columns share, is a banner or footer
+COLUMN_LINE_GAP_RATIO = 2.5
+
+
+def _is_bold(fontname: str) -> bool:
+    return bool(BOLD_FONT_PATTERN.search(fontname or ""))
+
+
+def _header_key(text: str) -> str:
+    return text.lower().strip().strip(":").strip()
+
+
+def find_column_gutter(words: List[Dict], page_width: float) -> Optional[float]:
+    """
+    Return the x position of a vertical gutter splitting the page into two
+    columns, or None for single-column pages. A gutter is an x in the middle
+    half of the page crossed by almost no words, with enough words on each side.
+    """
+    if len(words) < 20:
+        return None
+    candidates: List[Tuple[float, int]] = []
+    x = page_width * 0.25
+    step = 2.0
+    while x <= page_width * 0.75:
+        crossing = 0
+        left = 0
+        for w in words:
+            if w["x0"] < x < w["x1"]:
+                crossing += 1
+            elif w["x1"] <= x:
+                left += 1
+        right = len(words) - left - crossing
+        if left >= len(words) * MIN_COLUMN_SHARE and right >= len(words) * MIN_COLUMN_SHARE:
+            candidates.append((x, crossing))
+        else:
+            candidates.append((x, None))
+        x += step
+    valid = [c for _, c in candidates if c is not None]
+    if not valid or min(valid) > len(words) * MAX_GUTTER_CROSSING_RATIO:
+        return None
+    # Take the middle of the widest run of least-crossed positions
+    least = min(valid)
+    best_run: List[float] = []
+    run: List[float] = []
+    for x, crossing in candidates:
+        if crossing == least:
+            run.append(x)
+            if len(run) > len(best_run):
+                best_run = list(run)
+        else:
+            run = []
+    return best_run[len(best_run) // 2]
+
+
+def _make_line(top: float, words: List[Dict]) -> Dict:
+    words = sorted(words, key=lambda w: w["x0"])
+    return {
+        "top": top,
+        "words": words,
+        "text": " ".join(w["text"] for w in words),
+        "size": max(w.get("size", 0) for w in words),
+        "bold": all(_is_bold(w.get("fontname", "")) for w in words)
+    }
+
+
+def group_lines(words: Iterable[Dict]) -> List[Dict]:
+    """Cluster words into visual lines by `top`, then order each line left to right."""
+    clusters: List[Tuple[float, List[Dict]]] = []
+    for w in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if clusters and abs(w["top"] - clusters[-1][0]) <= LINE_Y_TOLERANCE:
+            clusters[-1][1].append(w)
+        else:
+            clusters.append((w["top"], [w]))
+    return [_make_line(top, cluster) for top, cluster in clusters]
+
+
+def _detach_outside_rows(side: List[Dict], top: float, bottom: float) -> List[Dict]:
+    """
+    Lines of one column that sit above `top` or below `bottom` (the rows both
+    columns share) and are not joined to the column by normal line spacing.
+    """
+    detached = []
+    above = sorted((l for l in side if l["top"] < top - LINE_Y_TOLERANCE), key=lambda l: -l["top"])
+    below = sorted((l for l in side if l["top"] > bottom + LINE_Y_TOLERANCE), key=lambda l: l["top"])
+    for outside, edge in ((above, top), (below, bottom)):
+        reference = edge
+        reference_size = max((l["size"] for l in side if abs(l["top"] - edge) <= LINE_Y_TOLERANCE), default=0)
+        for i, line in enumerate(outside):
+            if abs(line["top"] - reference) > COLUMN_LINE_GAP_RATIO * max(reference_size, line["size"]):
+                detached.extend(outside[i:])
+                break
+            reference, reference_size = line["top"], line["size"]
+    return detached
+
+
+def split_columns(words: List[Dict], gutter: float) -> List[Dict]:
+    """
+    Lines of a two-column page in reading order. Words are grouped into lines
+    first; a line is full-width when a word crosses the gutter or its words on
+    either side are only a word space apart (a centred name or contact line),
+    or when it sits above or below the rows both columns share, apart from its
+    column. Every other line is split at the gutter. Full-width lines are read
+    in place, and the column lines between two of them left column first.
+    """
+    full: List[Dict] = []
+    left: List[Dict] = []
+    right: List[Dict] = []
+    shared_rows: List[float] = []
+    for line in group_lines(words):
+        before = [w for w in line["words"] if w["x1"] <= gutter]
+        after = [w for w in line["words"] if w["x0"] >= gutter]
+        crosses = len(before) + len(after) < len(line["words"])
+        if crosses or (before and after and after[0]["x0"] - before[-1]["x1"] <= line["size"] * MAX_WORD_GAP_RATIO):
+            full.append(line)
+            continue
+        if before:
+            left.append(_make_line(line["top"], before))
+        if after:
+            right.append(_make_line(line["top"], after))
+        if before and after:
+            shared_rows.append(line["top"])
+
+    if shared_rows:
+        for side in (left, right):
+            detached = _detach_outside_rows(side, min(shared_rows), max(shared_rows))
+            full.extend(detached)
+            detached_ids = {id(l) for l in detached}
+            side[:] = [l for l in side if id(l) not in detached_ids]
+
+    ordered: List[Dict] = []
+    band_left: List[Dict] = []
+    band_right: List[Dict] = []
+    tagged = [(l["top"], 0, l) for l in full] + [(l["top"], 1, l) for l in left] + [(l["top"], 2, l) for l in right]
+    for _, kind, line in sorted(tagged, key=lambda t: (t[0], t[1])):
+        if kind == 0:
+            ordered.extend(band_left + band_right)
+            band_left, band_right = [], []
+            ordered.append(line)
+        else:
+            (band_left if kind == 1 else band_right).append(line)
+    return ordered + band_left + band_right
+
+
+def is_header_line(line: Dict, body_size: float, known_headers: Optional[set] = None) -> bool:
+    """
+    Typography decides, not capitalisation alone: a short line is a header if
+    it matches a known section name, is noticeably larger than body text, or
+    is bold and upper-case. Bold-only lines (job titles, degrees) are not.
+    """
+    text = line["text"].strip()
+    if not text or len(text) > MAX_HEADER_CHARS or len(line["words"]) > MAX_HEADER_WORDS:
+        return False
+    if not re.search(r"[A-Za-z]", text) or text.endswith((".", ",")) or "@" in text:
+        return False
+    if known_headers and _header_key(text) in known_headers:
+        return True
+    if line["size"] >= body_size * HEADER_SIZE_RATIO:
+        return True
+    letters = re.sub(r"[^A-Za-z]", "", text)
+    return line["bold"] and letters.isupper() and len(letters) >= 3
+
+
+def segment_pdf(file_path: str, known_headers: Optional[set] = None, max_pages: Optional[int] = None) -> Dict:
+    """
+    Read words with font size and weight once per page and return plain text
+    in reading order plus section spans detected from typography:
+
+        {"text": str, "sections": [(header, [line, ...]), ...], "pages": int}
+
+    Two-column pages are split at the gutter and read left column first;
+    full-width lines such as a name banner stay whole (see split_columns).
+    Lines before the first header (name, contact block) only appear in `text`.
+    The first line of the document is never treated as a header, since it is
+    nearly always the candidate's name in the largest font on the page.
+    """
+    page_lines: List[List[Dict]] = []
+    sizes: List[float] = []
+    with pdfplumber.open(file_path) as pdf:
+        pages = pdf.pages[:max_pages] if max_pages else pdf.pages
+        for page in pages:
+            words = page.extract_words(x_tolerance=2, y_tolerance=2, extra_attrs=["size", "fontname"])
+            if not words:
+                page_lines.append([])
+                continue
+            sizes.extend(w.get("size", 0) for w in words)
+            gutter = find_column_gutter(words, float(page.width))
+            page_lines.append(group_lines(words) if gutter is None else split_columns(words, gutter))
+
+    body_size = statistics.median(sizes) if sizes else 0
+    text_lines: List[str] = []
+    sections: List[Tuple[str, List[str]]] = []
+    first_line = True
+    for lines in page_lines:
+        for line in lines:
+            text_lines.append(line["text"])
+            if not first_line and is_header_line(line, body_size, known_headers):
+                sections.append((line["text"].strip().strip(":").strip(), []))
+            elif sections:
+                sections[-1][1].append(line["text"].strip())
+            first_line = False
+
+    text = "\n".join(text_lines)
+    logger.info(f"Segmented {len(page_lines)} pages into {len(sections)} sections (body font {body_size:.1f}pt)")
+    return {
+        "text": text.encode("utf-8", errors="ignore").decode("utf-8").strip(),
+        "sections": sections,
+        "pages": len(page_lines)
+    }
@@ -0,0 +1,122 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = "2023-06-01"
+RETRYABLE_RESULT_TYPES = {"errored", "expired", "canceled"}
+
+
+class BatchError(Exception):
+    pass
+
+
+class MessageBatchClient:
+    """
+    Minimal async client for the Message Batches endpoints:
+    create a batch, poll it until processing ends, then stream the JSONL results.
+    """
+
+    def __init__(self, api_key: str, base_url: str = "https://api.anthropic.com", poll_interval: float = 10.0,
+                 max_wait: float = 24 * 3600, session: Optional[aiohttp.ClientSession] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._session = session
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "Content-Type": "application/json"
+        }
+
+    async def _request(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs):
+        async with session.request(method, url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=300), **kwargs) as res:
+            body = await res.text()
+            if res.status != 200:
+                raise BatchError(f"{method} {url} failed: {res.status} {body[:500]}")
+            return body
+
+    async def create(self, session: aiohttp.ClientSession, requests: List[Dict]) -> Dict:
+        body = await self._request(session, "POST", f"{self.base_url}/v1/messages/batches", json={"requests": requests})
+        return json.loads(body)
+
+    async def retrieve(self, session: aiohttp.ClientSession, batch_id: str) -> Dict:
+        body = await self._request(session, "GET", f"{self.base_url}/v1/messages/batches/{batch_id}")
+        return json.loads(body)
+
+    async def wait(self, session: aiohttp.ClientSession, batch_id: str) -> Dict:
+        started = time.monotonic()
+        while True:
+            batch = await self.retrieve(session, batch_id)
+            if batch.get("processing_status") == "ended":
+                return batch
+            if time.monotonic() - started > self.max_wait:
+                raise BatchError(f"Batch {batch_id} did not finish within {self.max_wait}s")
+            logger.info(f"Batch {batch_id} {batch.get('processing_status')}: {batch.get('request_counts')}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def results(self, session: aiohttp.ClientSession, batch: Dict) -> List[Dict]:
+        url = batch.get("results_url") or f"{self.base_url}/v1/messages/batches/{batch['id']}/results"
+        body = await self._request(session, "GET", url)
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    async def run(self, params_by_key: Dict[str, Dict], max_retries: int = 2) -> Dict[str, Dict]:
+        """
+        Submit one request per key, wait for the batch and map results back
+        by custom id. Items that errored, expired or were canceled are
+        resubmitted in a new, smaller batch up to `max_retries` times; the
+        rest are never sent twice. Returns key -> {"message": ..., "attempts": n} or {"error": ...}.
+        """
+        # Keys (usernames, file names) are not valid custom ids in general and could
+        # collide with a generated id, so every item is addressed by its index
+        id_to_key = {f"item-{i}": key for i, key in enumerate(params_by_key)}
+
+        results: Dict[str, Dict] = {}
+        pending = list(id_to_key)
+        session = self._session or aiohttp.ClientSession()
+        try:
+            for attempt in range(max_retries + 1):
+                if not pending:
+                    break
+                batch = await self.create(session, [
+                    {"custom_id": cid, "params": params_by_key[id_to_key[cid]]} for cid in pending
+                ])
+                logger.info(f"Submitted batch {batch['id']} with {len(pending)} requests (attempt {attempt + 1})")
+                batch = await self.wait(session, batch["id"])
+                failed = []
+                returned = set()
+                for line in await self.results(session, batch):
+                    cid = line.get("custom_id")
+                    if cid not in id_to_key:
+                        continue
+                    returned.add(cid)
+                    result = line.get("result", {})
+                    if result.get("type") == "succeeded":
+                        results[id_to_key[cid]] = {"message": result.get("message", {}), "attempts": attempt + 1}
+                    elif result.get("type") in RETRYABLE_RESULT_TYPES:
+                        failed.append(cid)
+                        results[id_to_key[cid]] = {"error": f"Batch item {result.get('type')}: {result.get('error')}"}
+                    else:
+                        results[id_to_key[cid]] = {"error": f"Unexpected batch result: {result}"}
+                failed.extend(cid for cid in pending if cid not in returned)
+                pending = failed
+                if pending:
+                    logger.warning(f"{len(pending)} batch items failed, retrying" if attempt < max_retries else
+                                   f"{len(pending)} batch items failed after {max_retries} retries")
+        finally:
+            if self._session is None:
+                await session.close()
+        for cid in pending:
+            results.setdefault(id_to_key[cid], {"error": "Batch item failed after retries"})
+        return results
@@ -0,0 +1,256 @@
+import math
+import time
+import datetime
+import threading
+import logging
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, output, cache write, cache read)
+MODEL_PRICING = {
+    "claude-3-5-sonnet-20240620": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 1.00, 0.08),
+    "claude-3-haiku-20240307": (0.25, 1.25, 0.30, 0.03),
+}
+BATCH_DISCOUNT = 0.5
+
+# Report buckets over the (preprocessed) input length, in characters
+INPUT_CHAR_BUCKETS = [2000, 4000, 6000, 8000, 12000, 16000, 32000]
+
+
+def new_usage(payload: Dict, text: str, max_input_chars: int, stage: str, mode: str = "interactive") -> Dict:
+    """Usage record for one Messages API call; sizes are filled in now, tokens and timings as the call completes."""
+    return {
+        "model": payload.get("model"),
+        "stage": stage,
+        "mode": mode,
+        "prompt_chars": sum(len(m.get("content") or "") for m in payload.get("messages", []) if isinstance(m.get("content"), str)),
+        "input_chars": len(text),
+        "sent_chars": min(len(text), max_input_chars),
+        "truncated": len(text) > max_input_chars,
+        "truncated_chars": max(0, len(text) - max_input_chars),
+        "input_tokens": None,
+        "output_tokens": None,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_status": None,
+        "stop_reason": None,
+        "http_status": None,
+        "ttfb_ms": None,
+        "total_ms": None,
+        "retries": 0,
+        "status": None,
+        "cost_usd": None,
+        "at": datetime.datetime.utcnow()
+    }
+
+
+def add_message_usage(usage: Dict, message: Dict):
+    """Copy the `usage` block and stop reason of a Messages API response into `usage`."""
+    reported = message.get("usage") or {}
+    usage["input_tokens"] = reported.get("input_tokens")
+    usage["output_tokens"] = reported.get("output_tokens")
+    usage["cache_creation_input_tokens"] = reported.get("cache_creation_input_tokens") or 0
+    usage["cache_read_input_tokens"] = reported.get("cache_read_input_tokens") or 0
+    usage["stop_reason"] = message.get("stop_reason")
+    if usage["cache_read_input_tokens"]:
+        usage["cache_status"] = "hit"
+    elif usage["cache_creation_input_tokens"]:
+        usage["cache_status"] = "write"
+    else:
+        usage["cache_status"] = "miss"
+
+
+def estimate_cost(usage: Dict) -> Optional[float]:
+    pricing = MODEL_PRICING.get(usage.get("model"))
+    if pricing is None or usage.get("input_tokens") is None:
+        return None
+    input_price, output_price, write_price, read_price = pricing
+    cost = (
+        usage["input_tokens"] * input_price
+        + (usage.get("output_tokens") or 0) * output_price
+        + usage.get("cache_creation_input_tokens", 0) * write_price
+        + usage.get("cache_read_input_tokens", 0) * read_price
+    ) / 1_000_000
+    if usage.get("mode") == "batch":
+        cost *= BATCH_DISCOUNT
+    return round(cost, 6)
+
+
+def finish_usage(usage: Dict, started: float, data: Dict) -> Dict:
+    usage["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    usage["status"] = "error" if "error" in data else "ok"
+    usage["cost_usd"] = estimate_cost(usage)
+    return usage
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))], 2)
+
+
+def pearson(xs: List[float], ys: List[float]) -> Optional[float]:
+    if len(xs) < 3:
+        return None
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if not var_x or not var_y:
+        return None
+    return round(cov / math.sqrt(var_x * var_y), 3)
+
+
+def latency_summary(values: List[float]) -> Dict:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "samples": len(values)}
+
+
+class LLMMetrics:
+    """
+    In-process aggregate of usage records: counters overall and per stage,
+    plus the latencies of the last `window` calls for percentiles. Latencies
+    are kept per mode, since a batch item's total_ms is the wall time of its
+    whole job and would swamp interactive percentiles.
+    """
+
+    COUNTERS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "retries")
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Counter] = {}
+        self._cost: Counter = Counter()
+        self.window = window
+        self._total_ms: Dict[str, deque] = {}
+        self._ttfb_ms: Dict[str, deque] = {}
+
+    def record(self, usage: Dict):
+        with self._lock:
+            counts = self._stages.setdefault(usage.get("stage") or "unknown", Counter())
+            counts["calls"] += 1
+            counts["errors"] += usage.get("status") == "error"
+            counts["truncated"] += bool(usage.get("truncated"))
+            counts[f"cache_{usage.get('cache_status') or 'none'}"] += 1
+            for field in self.COUNTERS:
+                counts[field] += usage.get(field) or 0
+            self._cost[usage.get("stage") or "unknown"] += usage.get("cost_usd") or 0
+            mode = usage.get("mode") or "interactive"
+            if usage.get("total_ms") is not None:
+                self._total_ms.setdefault(mode, deque(maxlen=self.window)).append(usage["total_ms"])
+            if usage.get("ttfb_ms") is not None:
+                self._ttfb_ms.setdefault(mode, deque(maxlen=self.window)).append(usage["ttfb_ms"])
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {stage: dict(counts, cost_usd=round(self._cost[stage], 4)) for stage, counts in self._stages.items()}
+            total_ms = {mode: list(values) for mode, values in self._total_ms.items()}
+            ttfb_ms = {mode: list(values) for mode, values in self._ttfb_ms.items()}
+        totals = Counter()
+        for counts in stages.values():
+            totals.update(counts)
+        return {
+            "totals": dict(totals),
+            "stages": stages,
+            "latency_ms": {mode: latency_summary(values) for mode, values in total_ms.items()},
+            "ttfb_ms": {mode: latency_summary(values) for mode, values in ttfb_ms.items()}
+        }
+
+
+def iter_usage(collection, since: Optional[datetime.datetime] = None, mode: Optional[str] = "interactive") -> Iterator[Dict]:
+    """Stored usage of successful calls. Batch calls share one wall time per job, so they are excluded by default."""
+    query = {"llm_usage.status": "ok"}
+    if mode:
+        query["llm_usage.mode"] = mode
+    if since:
+        query["llm_usage.at"] = {"$gte": since}
+    cursor = collection.find(query, {"_id": 0, "llm_usage": 1}).batch_size(1000)
+    try:
+        for doc in cursor:
+            yield doc["llm_usage"]
+    finally:
+        cursor.close()
+
+
+def _bucket_label(input_chars: int) -> str:
+    lower = 0
+    for upper in INPUT_CHAR_BUCKETS:
+        if input_chars < upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f"{lower}+"
+
+
+def usage_report(usages: Iterator[Dict], max_input_chars: int) -> Dict:
+    """
+    Relate input size, truncation at `max_input_chars` and latency across
+    stored usage records: one row per input-size bucket, plus how strongly
+    input and output tokens track latency and how much text truncation drops.
+    """
+    buckets: Dict[str, List[Dict]] = {}
+    input_tokens, output_tokens, total_ms, chars_per_token = [], [], [], []
+    count = 0
+    for usage in usages:
+        if usage.get("input_tokens") is None or usage.get("total_ms") is None:
+            continue
+        count += 1
+        buckets.setdefault(_bucket_label(usage["input_chars"]), []).append(usage)
+        input_tokens.append(usage["input_tokens"])
+        output_tokens.append(usage.get("output_tokens") or 0)
+        total_ms.append(usage["total_ms"])
+        if usage["input_tokens"] and usage.get("prompt_chars"):
+            chars_per_token.append(usage["prompt_chars"] / usage["input_tokens"])
+
+    rows = []
+    for label, group in sorted(buckets.items(), key=lambda item: int(item[0].split("-")[0].rstrip("+"))):
+        latencies = [u["total_ms"] for u in group]
+        rows.append({
+            "input_chars": label,
+            "calls": len(group),
+            "truncated_pct": round(100 * sum(bool(u.get("truncated")) for u in group) / len(group), 1),
+            "avg_input_tokens": round(sum(u["input_tokens"] for u in group) / len(group)),
+            "avg_output_tokens": round(sum(u.get("output_tokens") or 0 for u in group) / len(group)),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p50_ttfb_ms": percentile([u["ttfb_ms"] for u in group if u.get("ttfb_ms") is not None], 50),
+            "avg_cost_usd": round(sum(u.get("cost_usd") or 0 for u in group) / len(group), 5)
+        })
+
+    ratio = sum(chars_per_token) / len(chars_per_token) if chars_per_token else None
+    truncated = [u for group in buckets.values() for u in group if u.get("truncated")]
+    dropped_chars = sum(u.get("truncated_chars") or 0 for u in truncated)
+    return {
+        "calls": count,
+        "max_input_chars": max_input_chars,
+        "buckets": rows,
+        "latency_vs_input_tokens": pearson(input_tokens, total_ms),
+        "latency_vs_output_tokens": pearson(output_tokens, total_ms),
+        "chars_per_input_token": round(ratio, 2) if ratio else None,
+        "truncated_calls": len(truncated),
+        "truncated_chars": dropped_chars,
+        "truncated_tokens_est": round(dropped_chars / ratio) if ratio else None
+    }
+
+
+def format_report(report: Dict) -> str:
+    columns = ["input_chars", "calls", "truncated_pct", "avg_input_tokens", "avg_output_tokens",
+               "p50_ms", "p95_ms", "p50_ttfb_ms", "avg_cost_usd"]
+    widths = {c: max([len(c)] + [len(str(row[c])) for row in report["buckets"]]) for c in columns}
+    lines = [
+        f"LLM calls: {report['calls']} (input truncated at {report['max_input_chars']} chars)",
+        "  ".join(c.ljust(widths[c]) for c in columns)
+    ]
+    for row in report["buckets"]:
+        lines.append("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+    lines += [
+        f"Latency correlation: input tokens {report['latency_vs_input_tokens']}, output tokens {report['latency_vs_output_tokens']}",
+        f"Chars per input token: {report['chars_per_input_token']}",
+        f"Truncated calls: {report['truncated_calls']}, dropped {report['truncated_chars']} chars "
+        f"(~{report['truncated_tokens_est']} tokens)"
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,226 @@
+import copy
+import time
+import asyncio
+import hashlib
+import functools
+import threading
+import contextvars
+import logging
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from .cache import LRUCache
+from .profiling import sampled_thread
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """A stage raised or its backend returned {"error": ...}."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+class PipelineResult:
+    """
+    State of one document moving through a pipeline, and the common result
+    every entry point reads back: the source file, extracted text and
+    section spans, each stage's output by stage name, per-stage timings and
+    the stages served from cache. Backends may leave extra values in `meta`
+    (such as LLM usage) for later stages.
+    """
+
+    def __init__(self, file_path: str, file_type: Optional[str] = None, key: Optional[str] = None,
+                 file_buffer: Optional[bytes] = None, meta: Optional[Dict] = None):
+        self.file_path = file_path
+        self.file_type = file_type
+        self.key = key
+        self.file_buffer = file_buffer
+        self.meta: Dict[str, Any] = meta or {}
+        self.outputs: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.cached: List[str] = []
+        self.started = time.perf_counter()
+        self._sha256: Optional[str] = None
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            if self.file_buffer is None:
+                with open(self.file_path, "rb") as f:
+                    self.file_buffer = f.read()
+            self._sha256 = hashlib.sha256(self.file_buffer).hexdigest()
+        return self._sha256
+
+    @property
+    def text(self) -> str:
+        return (self.outputs.get("extract") or {}).get("text", "")
+
+    @property
+    def sections(self):
+        return (self.outputs.get("extract") or {}).get("sections")
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def output(self, stage: str, default: Any = None) -> Any:
+        return self.outputs.get(stage, default)
+
+    def summary(self) -> Dict:
+        return {"key": self.key, "sha256": self._sha256, "timings": self.timings, "cached": self.cached}
+
+
+def file_cache_key(result: PipelineResult) -> str:
+    """Default cache key: stage outputs that depend only on the file are shared by identical uploads."""
+    return result.sha256
+
+
+class Stage:
+    """
+    One pluggable step. `backend(result)` may be sync or async and returns
+    the stage output. Sync backends run on `executor` when one is given
+    (inline otherwise), with the caller's context so stage timings and
+    annotations land on the active capture, and the worker thread is
+    registered with its sampling profiler while the backend runs. When
+    `cache` is set, outputs are stored under (stage name, version,
+    `cache_key(result)`).
+    """
+
+    def __init__(self, name: str, backend: Callable[[PipelineResult], Any], executor: Optional[Executor] = None,
+                 cache: Optional[LRUCache] = None, cache_key: Callable[[PipelineResult], Optional[str]] = file_cache_key,
+                 version: int = 1):
+        self.name = name
+        self.backend = backend
+        self.executor = executor
+        self.cache = cache
+        self.cache_key = cache_key
+        self.version = version
+
+    async def call(self, result: PipelineResult) -> Any:
+        if asyncio.iscoroutinefunction(self.backend):
+            return await self.backend(result)
+        if self.executor is None:
+            return self.backend(result)
+        def run_backend():
+            with sampled_thread():
+                return self.backend(result)
+
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, run_backend))
+
+
+class PipelineMetrics:
+    """Per-stage call, error and cache-hit counters and total time, for every run of a pipeline."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Counter] = {}
+
+    def record(self, stage: str, ms: float, cached: bool = False, error: bool = False):
+        with self._lock:
+            counts = self._stages.setdefault(stage, Counter())
+            counts["calls"] += 1
+            counts["cache_hits"] += cached
+            counts["errors"] += error
+            counts["total_ms"] += ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {name: dict(counts) for name, counts in self._stages.items()}
+        for counts in stages.values():
+            computed = counts["calls"] - counts["cache_hits"]
+            counts["total_ms"] = round(counts["total_ms"], 2)
+            counts["avg_ms"] = round(counts["total_ms"] / computed, 2) if computed else None
+        return stages
+
+
+Step = Union[Stage, Sequence[Stage]]
+
+
+class Pipeline:
+    """
+    Ordered steps, each a Stage or a list of Stages that only depend on
+    earlier steps and run concurrently. `run` stops at the first failing
+    stage, cancels the other stages of its step (so a failed NER does not
+    leave a paid LLM request running) and raises PipelineError; `only` restricts a run to named stages
+    (e.g. extraction and NER for a batch import that calls the LLM itself).
+    """
+
+    def __init__(self, steps: Iterable[Step], metrics: Optional[PipelineMetrics] = None):
+        self.steps: List[List[Stage]] = [[step] if isinstance(step, Stage) else list(step) for step in steps]
+        self.metrics = metrics or PipelineMetrics()
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for step in self.steps for stage in step]
+
+    async def _run_stage(self, stage: Stage, result: PipelineResult):
+        started = time.perf_counter()
+        key = None
+        if stage.cache is not None:
+            key = stage.cache_key(result)
+            if key is not None:
+                hit = stage.cache.get(stage.name, (stage.version, key))
+                if hit is not None:
+                    result.outputs[stage.name] = copy.deepcopy(hit)
+                    result.cached.append(stage.name)
+                    result.timings[stage.name] = round((time.perf_counter() - started) * 1000, 2)
+                    self.metrics.record(stage.name, result.timings[stage.name], cached=True)
+                    return
+        try:
+            output = await stage.call(result)
+        except PipelineError:
+            self.metrics.record(stage.name, (time.perf_counter() - started) * 1000, error=True)
+            raise
+        except Exception as e:
+            self.metrics.record(stage.name, (time.perf_counter() - started) * 1000, error=True)
+            raise PipelineError(stage.name, str(e)) from e
+        ms = round((time.perf_counter() - started) * 1000, 2)
+        if isinstance(output, dict) and "error" in output:
+            self.metrics.record(stage.name, ms, error=True)
+            raise PipelineError(stage.name, str(output["error"]))
+        result.outputs[stage.name] = output
+        result.timings[stage.name] = ms
+        self.metrics.record(stage.name, ms)
+        if key is not None:
+            stage.cache.set(stage.name, (stage.version, key), copy.deepcopy(output))
+
+    async def _run_step(self, stages: List[Stage], result: PipelineResult):
+        tasks = [asyncio.ensure_future(self._run_stage(stage, result)) for stage in stages]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Sync backends already on the executor finish there; their results are dropped
+            await asyncio.gather(*pending, return_exceptions=True)
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def run(self, result: PipelineResult, only: Optional[Iterable[str]] = None) -> PipelineResult:
+        only = set(only) if only is not None else None
+        for step in self.steps:
+            stages = [stage for stage in step if only is None or stage.name in only]
+            if len(stages) == 1:
+                await self._run_stage(stages[0], result)
+            elif stages:
+                await self._run_step(stages, result)
+        logger.info(f"Pipeline finished for {result.key} in {result.elapsed_ms} ms: {result.timings}"
+                    + (f" (cached: {', '.join(result.cached)})" if result.cached else ""))
+        return result
+
+    def run_sync(self, result: PipelineResult, only: Optional[Iterable[str]] = None) -> PipelineResult:
+        """For sync callers such as the app/ blueprint views."""
+        return asyncio.run(self.run(result, only))
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import datetime
+import functools
+import threading
+import contextlib
+import contextvars
+import logging
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_current_capture: contextvars.ContextVar = contextvars.ContextVar("profile_capture", default=None)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for one thread plus any worker threads
+    registered while they run work for it. A daemon thread reads the frames
+    of those threads every `interval` seconds and counts stacks in folded
+    format ('root;child;leaf count'), which flamegraph.pl, speedscope and
+    inferno read directly. Worker stacks are rooted at the thread name. The
+    profiled threads are never traced.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 128):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._workers: Counter = Counter()
+        self._worker_names: Dict[int, str] = {}
+        self._workers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: int, name: str):
+        with self._workers_lock:
+            self._workers[thread_id] += 1
+            self._worker_names[thread_id] = name
+
+    def remove_thread(self, thread_id: int):
+        with self._workers_lock:
+            self._workers[thread_id] -= 1
+            if self._workers[thread_id] <= 0:
+                del self._workers[thread_id]
+                del self._worker_names[thread_id]
+
+    def _frame_label(self, frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self, frame, root: Optional[str] = None):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._frame_label(frame))
+            frame = frame.f_back
+        if stack:
+            if root:
+                stack.append(root)
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._workers_lock:
+                workers = dict(self._worker_names)
+            self._sample(frames.get(self.thread_id))
+            for thread_id, name in workers.items():
+                if thread_id != self.thread_id:
+                    self._sample(frames.get(thread_id), f"[{name}]")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class ProfileCapture:
+    """
+    Per-request capture: total duration, per-stage timings and annotations
+    (such as the input file hash) and, when `sample` is set, a folded stack
+    profile. Stage timings are collected through a context variable, so
+    `profile_stage` decorated functions cost one lookup when nothing is captured.
+    """
+
+    def __init__(self, name: str, store: "ProfileStore", sample: bool = True, interval: float = 0.005):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.store = store
+        self.sample = sample
+        self.interval = interval
+        self.stages: List[Dict] = []
+        self.annotations: Dict = {}
+        self.started_at = None
+        self.duration_ms = None
+        self._profiler: Optional[SamplingProfiler] = None
+        self._token = None
+        self._start = None
+
+    def __enter__(self):
+        self.started_at = datetime.datetime.utcnow()
+        self._start = time.perf_counter()
+        self._token = _current_capture.set(self)
+        if self.sample:
+            self._profiler = SamplingProfiler(threading.get_ident(), self.interval)
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profiler:
+            self._profiler.stop()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        _current_capture.reset(self._token)
+        if exc_type:
+            self.annotations["error"] = f"{exc_type.__name__}: {exc}"
+        self.store.add(self)
+        return False
+
+    def folded(self) -> str:
+        return self._profiler.folded() if self._profiler else ""
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat() + "Z",
+            "duration_ms": round(self.duration_ms or 0, 2),
+            "stages": self.stages,
+            "sampled": self._profiler is not None,
+            "samples": sum(self._profiler.samples.values()) if self._profiler else 0,
+            **self.annotations
+        }
+
+
+@contextlib.contextmanager
+def sampled_thread():
+    """
+    Sample the calling thread under the active capture for the duration of
+    the block. For work handed to an executor with the capture's context
+    (see pipeline.Stage); outside a sampled capture it does nothing.
+    """
+    capture = _current_capture.get()
+    profiler = capture._profiler if capture is not None else None
+    if profiler is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profiler.add_thread(thread_id, threading.current_thread().name)
+    try:
+        yield
+    finally:
+        profiler.remove_thread(thread_id)
+
+
+def is_capturing() -> bool:
+    """For callers that would do extra work (hashing the upload) only to annotate a capture."""
+    return _current_capture.get() is not None
+
+
+def annotate(**values):
+    """Attach metadata (e.g. file_sha256) to the active capture, if any."""
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.annotations.update(values)
+
+
+def _record_stage(name: str, started: float):
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.stages.append({"stage": name, "ms": round((time.perf_counter() - started) * 1000, 2)})
+
+
+def profile_stage(name: Optional[str] = None):
+    """Record the wall time of a sync or async function as a stage of the active capture."""
+    def decorator(func):
+        stage = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _record_stage(stage, started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record_stage(stage, started)
+        return wrapper
+    return decorator
+
+
+def should_profile(sample_rate: float, forced: bool = False) -> bool:
+    return forced or (sample_rate > 0 and random.random() < sample_rate)
+
+
+class ProfileStore:
+    """
+    Keeps the most recent captures in memory and writes each sampled one to
+    `directory` as <id>.folded plus <id>.json metadata, so the slowest
+    requests can be listed and their flamegraphs downloaded later. Files
+    are deleted when their capture drops out of the last `max_entries`, and
+    leftovers from earlier runs beyond that count are removed at startup.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 200):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._recent = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._prune_directory()
+
+    def _remove_files(self, capture_id: str):
+        for suffix in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(self.directory, capture_id + suffix))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove profile {capture_id}{suffix}: {e}")
+
+    def _prune_directory(self):
+        try:
+            folded = [name for name in os.listdir(self.directory) if name.endswith(".folded")]
+            folded.sort(key=lambda name: os.path.getmtime(os.path.join(self.directory, name)))
+        except OSError as e:
+            logger.warning(f"Failed to list profiles in {self.directory}: {e}")
+            return
+        for name in folded[:max(0, len(folded) - self.max_entries)]:
+            self._remove_files(name[:-len(".folded")])
+
+    def add(self, capture: ProfileCapture):
+        summary = capture.summary()
+        with self._lock:
+            evicted = self._recent[0] if len(self._recent) == self._recent.maxlen else None
+            self._recent.append(summary)
+        if self.directory and evicted is not None and evicted["sampled"]:
+            self._remove_files(evicted["id"])
+        if self.directory and summary["sampled"]:
+            try:
+                with open(os.path.join(self.directory, f"{capture.id}.folded"), "w", encoding="utf-8") as f:
+                    f.write(capture.folded())
+                with open(os.path.join(self.directory, f"{capture.id}.json"), "w", encoding="utf-8") as f:
+                    json.dump(summary, f)
+            except OSError as e:
+                logger.warning(f"Failed to write profile {capture.id}: {e}")
+        logger.info(f"Profiled {capture.name} in {summary['duration_ms']} ms (id={capture.id})")
+
+    def slowest(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            recent = list(self._recent)
+        return sorted(recent, key=lambda s: s["duration_ms"], reverse=True)[:limit]
+
+    def folded(self, capture_id: str) -> Optional[str]:
+        if not self.directory or not capture_id.isalnum():
+            return None
+        path = os.path.join(self.directory, f"{capture_id}.folded")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
@@ -0,0 +1,248 @@
+import os
+import json
+import random
+import hashlib
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import torch
+from torch.utils.data import IterableDataset
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HARVEST_PROJECTION = {
+    "_id": 0, "username": 1, "pdfText": 1, "name": 1, "email": 1, "state": 1,
+    "education": 1, "experience": 1, "skills": 1, "certifications": 1, "updated_at": 1
+}
+
+# A list-valued label becomes one span covering neighbouring items, as long as
+# the gaps between them and the span as a whole stay short enough to be a section.
+MAX_ITEM_GAP_CHARS = 200
+MAX_ANSWER_CHARS = 600
+
+
+def _values(entries, *keys) -> List[str]:
+    values = []
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict):
+            values += [str(entry[k]) for k in keys if entry.get(k)]
+        elif entry:
+            values.append(str(entry))
+    return values
+
+
+def profile_labels(doc: Dict) -> Dict[str, List[str]]:
+    """
+    Weak labels for each parse_resume question, taken from the LLM-produced
+    fields of a stored profile. Address has no stored counterpart and is skipped.
+    """
+    skills = doc.get("skills") or {}
+    return {
+        "Name": [doc["name"]] if doc.get("name") else [],
+        "Email": [doc["email"]] if doc.get("email") else [],
+        "State": [doc["state"]] if doc.get("state") else [],
+        "Education": _values(doc.get("education"), "institution", "degree"),
+        "Skills": _values(skills.get("soft_skills")) + _values(skills.get("other_skills")) + _values(skills.get("languages")),
+        "Technical Skills": _values(skills.get("technical_skills")),
+        "Experience": _values(doc.get("experience"), "company", "role"),
+        "Certifications": _values(doc.get("certifications"), "name"),
+    }
+
+
+def locate_answer(context: str, values: List[str]) -> Optional[Tuple[int, str]]:
+    """
+    (answer_start, answer_text) for the labels in `context`, or None when no
+    label occurs verbatim (case-insensitively). Labels the LLM paraphrased
+    cannot be aligned to a span and are dropped rather than guessed.
+    """
+    lowered = context.lower()
+    spans = []
+    for value in values:
+        value = value.strip()
+        start = lowered.find(value.lower()) if value else -1
+        if start >= 0:
+            spans.append((start, start + len(value)))
+    if not spans:
+        return None
+    spans.sort()
+    start, end = spans[0]
+    for s, e in spans[1:]:
+        if s - end > MAX_ITEM_GAP_CHARS or e - start > MAX_ANSWER_CHARS:
+            break
+        end = max(end, e)
+    return start, context[start:end]
+
+
+def profile_examples(doc: Dict, questions: Dict[str, str]) -> Iterator[Dict]:
+    """
+    SQuAD v2 style examples for one profile. A question whose field is empty
+    in the profile becomes an unanswerable example; a question whose label
+    cannot be found in the text is skipped.
+    """
+    context = doc.get("pdfText") or ""
+    for section, values in profile_labels(doc).items():
+        if section not in questions:
+            continue
+        answers = {"text": [], "answer_start": []}
+        if values:
+            located = locate_answer(context, values)
+            if located is None:
+                continue
+            answers = {"text": [located[1]], "answer_start": [located[0]]}
+        yield {
+            "id": f"{doc.get('username')}:{section}",
+            "question": questions[section],
+            "context": context,
+            "answers": answers
+        }
+
+
+def harvest_examples(collection, questions: Dict[str, str], limit: Optional[int] = None,
+                     batch_size: int = 200) -> Iterator[Dict]:
+    """Stream examples from every stored profile with extracted text, one cursor batch at a time."""
+    cursor = collection.find({"pdfText": {"$nin": [None, ""]}}, HARVEST_PROJECTION).sort("updated_at", 1).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    try:
+        for doc in cursor:
+            yield from profile_examples(doc, questions)
+    finally:
+        cursor.close()
+
+
+def dataset_fingerprint(collection, settings: Dict) -> str:
+    """Cache key over the tokenization settings and the state of the profile collection."""
+    latest = collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+    state = {
+        "settings": settings,
+        "count": collection.count_documents({"pdfText": {"$nin": [None, ""]}}),
+        "latest": latest["updated_at"].isoformat() if latest and latest.get("updated_at") else None
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def tokenize_windows(tokenizer, examples: List[Dict], max_length: int = 384, stride: int = 128) -> Dict[str, List]:
+    """
+    Split each (question, context) into overlapping windows of `max_length`
+    tokens and map the answer's character span onto token positions. Windows
+    that do not contain the whole answer point at the CLS token, as in SQuAD v2.
+    """
+    encoded = tokenizer(
+        [e["question"].lstrip() for e in examples],
+        [e["context"] for e in examples],
+        truncation="only_second",
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+        padding="max_length"
+    )
+    windows = {"input_ids": [], "attention_mask": [], "start_positions": [], "end_positions": []}
+    for i, offsets in enumerate(encoded["offset_mapping"]):
+        input_ids = encoded["input_ids"][i]
+        cls_index = input_ids.index(tokenizer.cls_token_id) if tokenizer.cls_token_id in input_ids else 0
+        sequence_ids = encoded.sequence_ids(i)
+        answers = examples[encoded["overflow_to_sample_mapping"][i]]["answers"]
+
+        start_position = end_position = cls_index
+        if answers["answer_start"]:
+            start_char = answers["answer_start"][0]
+            end_char = start_char + len(answers["text"][0])
+            token_start = sequence_ids.index(1)
+            token_end = len(sequence_ids) - 1 - sequence_ids[::-1].index(1)
+            if offsets[token_start][0] <= start_char and offsets[token_end][1] >= end_char:
+                while token_start < len(offsets) and offsets[token_start][0] <= start_char:
+                    token_start += 1
+                start_position = token_start - 1
+                while offsets[token_end][1] >= end_char:
+                    token_end -= 1
+                end_position = token_end + 1
+
+        windows["input_ids"].append(input_ids)
+        windows["attention_mask"].append(encoded["attention_mask"][i])
+        windows["start_positions"].append(start_position)
+        windows["end_positions"].append(end_position)
+    return windows
+
+
+def build_shards(examples: Iterable[Dict], tokenizer, cache_dir: str, max_length: int = 384, stride: int = 128,
+                 shard_size: int = 2048, chunk_size: int = 64) -> Dict:
+    """
+    Tokenize `examples` as they stream in, `chunk_size` at a time, and write
+    windows to `cache_dir` in shards of `shard_size`. Only one shard is held in
+    memory. The manifest is written last, so a partial build is never reused.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {"max_length": max_length, "stride": stride, "shards": [], "windows": 0, "examples": 0, "answerable": 0}
+    buffer = {"input_ids": [], "attention_mask": [], "start_positions": [], "end_positions": []}
+
+    def flush():
+        if not buffer["input_ids"]:
+            return
+        path = os.path.join(cache_dir, f"shard-{len(manifest['shards']):05d}.pt")
+        torch.save({key: torch.tensor(values) for key, values in buffer.items()}, path)
+        manifest["shards"].append({"path": os.path.basename(path), "windows": len(buffer["input_ids"])})
+        manifest["windows"] += len(buffer["input_ids"])
+        for values in buffer.values():
+            values.clear()
+
+    def add_chunk(chunk: List[Dict]):
+        windows = tokenize_windows(tokenizer, chunk, max_length, stride)
+        for key, values in windows.items():
+            buffer[key].extend(values)
+        if len(buffer["input_ids"]) >= shard_size:
+            flush()
+
+    chunk = []
+    for example in examples:
+        chunk.append(example)
+        manifest["examples"] += 1
+        manifest["answerable"] += bool(example["answers"]["text"])
+        if len(chunk) >= chunk_size:
+            add_chunk(chunk)
+            chunk = []
+    if chunk:
+        add_chunk(chunk)
+    flush()
+
+    with open(os.path.join(cache_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Tokenized {manifest['examples']} examples into {manifest['windows']} windows "
+                f"across {len(manifest['shards'])} shards in {cache_dir}")
+    return manifest
+
+
+def load_manifest(cache_dir: str) -> Optional[Dict]:
+    path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ShardDataset(IterableDataset):
+    """
+    Streams tokenized windows from the shards in `cache_dir`, one shard in
+    memory at a time. Shard order and the windows within each shard are
+    reshuffled on every pass.
+    """
+
+    def __init__(self, cache_dir: str, manifest: Dict, seed: int = 42):
+        self.cache_dir = cache_dir
+        self.manifest = manifest
+        self.seed = seed
+        self._epoch = 0
+
+    def __iter__(self):
+        rng = random.Random(self.seed + self._epoch)
+        self._epoch += 1
+        shards = list(self.manifest["shards"])
+        rng.shuffle(shards)
+        for shard in shards:
+            tensors = torch.load(os.path.join(self.cache_dir, shard["path"]))
+            order = list(range(shard["windows"]))
+            rng.shuffle(order)
+            for i in order:
+                yield {key: values[i] for key, values in tensors.items()}
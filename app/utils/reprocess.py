@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VERSION_FIELDS = ("schema_version", "parser_version", "prompt_version")
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def stale_filter(targets: Dict[str, int]) -> Dict:
+    """Profiles where any version field is below target; `$not: {$gte}` also matches a missing field."""
+    return {"$or": [{field: {"$not": {"$gte": version}}} for field, version in targets.items()]}
+
+
+def plan_stages(doc: Dict, targets: Dict[str, int]) -> List[str]:
+    """
+    Decide which stages to re-run for a stored profile. The NER/regex stage
+    is local and its output is not stored, so it always runs; the LLM stage
+    only runs when the prompt changed or no raw LLM output was kept.
+    """
+    stages = ["ner"]
+    if (doc.get("prompt_version") or 0) < targets.get("prompt_version", 0) or not isinstance(doc.get("llm_raw"), dict):
+        stages.append("llm")
+    stages.append("structure")
+    return stages
+
+
+class ReprocessEngine:
+    """
+    Refresh stored profiles from their `pdfText` without re-extracting the
+    PDF. NER gets the section spans stored with the profile; older profiles
+    without them are re-segmented from `resumePdf` by `segment` when given.
+    Profiles are walked in `_id` order in batches; the last processed `_id`
+    is checkpointed to disk so an interrupted run resumes where it stopped.
+    Failed profiles are retried once at the end of the run, and a run that
+    reaches the end with none left failing removes its checkpoint. Fields in
+    `structured_fields` that the new parse no longer produces are unset, so
+    a refreshed profile never mixes old and new parser output. A dry run
+    writes nothing and only counts the LLM calls it would make. LLM calls
+    are bounded by a semaphore and a rate limiter, and each batch is written
+    with one unordered `bulk_write`. Writes are conditional on `updated_at`,
+    so a profile re-uploaded mid-run is left alone.
+    """
+
+    def __init__(
+        self,
+        collection,
+        targets: Dict[str, int],
+        ner: Callable[[str, Optional[List]], Dict],
+        llm: Callable[[str], Awaitable[Tuple[Dict, Dict]]],
+        structure: Callable[[Dict, Dict], Dict],
+        enrich: Optional[Callable[[Dict], Dict]] = None,
+        segment: Optional[Callable[[bytes], Optional[List]]] = None,
+        structured_fields: Iterable[str] = (),
+        batch_size: int = 100,
+        concurrency: int = 4,
+        llm_rate: float = 1.0,
+        batch_pause: float = 0.0,
+        checkpoint_path: Optional[str] = None,
+        dry_run: bool = False
+    ):
+        self.collection = collection
+        self.targets = targets
+        self.ner = ner
+        self.llm = llm
+        self.structure = structure
+        self.enrich = enrich
+        self.segment = segment
+        self.structured_fields = list(structured_fields)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.llm_rate = llm_rate
+        self.batch_pause = batch_pause
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+        self.stats = {"processed": 0, "updated": 0, "skipped": 0, "failed": 0, "llm_calls": 0, "llm_calls_planned": 0}
+        self.last_id: Optional[ObjectId] = None
+        self.failed_ids: List[ObjectId] = []
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("targets") != self.targets:
+            logger.info("Checkpoint targets differ from current versions, starting from the beginning")
+            return
+        self.last_id = ObjectId(checkpoint["last_id"]) if checkpoint.get("last_id") else None
+        self.failed_ids = [ObjectId(i) for i in checkpoint.get("failed_ids", [])]
+        self.stats.update(checkpoint.get("stats", {}))
+        logger.info(f"Resuming reprocess after _id {self.last_id} ({self.stats['processed']} already processed)")
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path or self.dry_run:
+            return
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "last_id": str(self.last_id) if self.last_id else None,
+                "failed_ids": [str(i) for i in self.failed_ids],
+                "targets": self.targets,
+                "stats": self.stats,
+                "saved_at": datetime.datetime.utcnow().isoformat()
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and not self.dry_run and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _find(self, query: Dict) -> List[Dict]:
+        projection = {"_id": 1, "username": 1, "pdfText": 1, "section_spans": 1, "llm_raw": 1, "updated_at": 1,
+                      **{f: 1 for f in VERSION_FIELDS}}
+        return list(self.collection.find(query, projection).sort("_id", 1).limit(self.batch_size))
+
+    def next_batch(self) -> List[Dict]:
+        query = stale_filter(self.targets)
+        if self.last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": self.last_id}}]}
+        return self._find(query)
+
+    async def section_spans(self, doc: Dict) -> Optional[List]:
+        if doc.get("section_spans"):
+            return doc["section_spans"]
+        if "section_spans" in doc or self.segment is None:
+            return None
+        stored = self.collection.find_one({"_id": doc["_id"]}, {"resumePdf": 1})
+        if not stored or not stored.get("resumePdf"):
+            return None
+        return await asyncio.to_thread(self.segment, bytes(stored["resumePdf"]))
+
+    async def reprocess_one(self, doc: Dict, semaphore: asyncio.Semaphore, limiter: RateLimiter) -> Optional[UpdateOne]:
+        text = doc.get("pdfText")
+        if not text:
+            self.stats["skipped"] += 1
+            return None
+        stages = plan_stages(doc, self.targets)
+        if self.dry_run and "llm" in stages:
+            # Paid requests are only counted; nothing would be written anyway
+            self.stats["llm_calls_planned"] += 1
+            return None
+        async with semaphore:
+            spans = await self.section_spans(doc)
+            spacy_data = await asyncio.to_thread(self.ner, text, spans)
+            if "error" in spacy_data:
+                raise ValueError(spacy_data["error"])
+            if "llm" in stages:
+                await limiter.acquire()
+                self.stats["llm_calls"] += 1
+                llm_data, llm_usage = await self.llm(text)
+                if "error" in llm_data:
+                    raise ValueError(llm_data["error"])
+                prompt_version = self.targets.get("prompt_version")
+            else:
+                llm_data, llm_usage = doc["llm_raw"], None
+                prompt_version = doc.get("prompt_version")
+        structured = self.structure(spacy_data, llm_data)
+        structured.update({
+            "llm_raw": llm_data,
+            "schema_version": self.targets.get("schema_version", structured.get("schema_version")),
+            "parser_version": self.targets.get("parser_version"),
+            "prompt_version": prompt_version,
+            "updated_at": datetime.datetime.utcnow(),
+            "reprocessed_at": datetime.datetime.utcnow()
+        })
+        if llm_usage is not None:
+            structured["llm_usage"] = llm_usage
+        if self.enrich:
+            structured = self.enrich(structured)
+        update = {"$set": structured}
+        dropped = {field: "" for field in self.structured_fields if field not in structured}
+        if dropped:
+            update["$unset"] = dropped
+        return UpdateOne({"_id": doc["_id"], "updated_at": doc.get("updated_at")}, update)
+
+    async def process_batch(self, batch: List[Dict], semaphore: asyncio.Semaphore, limiter: RateLimiter,
+                            retry: bool = False):
+        results = await asyncio.gather(
+            *(self.reprocess_one(doc, semaphore, limiter) for doc in batch),
+            return_exceptions=True
+        )
+        operations = []
+        for doc, result in zip(batch, results):
+            if not retry:
+                self.stats["processed"] += 1
+            if isinstance(result, Exception):
+                if not retry:
+                    self.stats["failed"] += 1
+                    self.failed_ids.append(doc["_id"])
+                logger.warning(f"Reprocess failed for {doc.get('username')} ({doc['_id']}): {result}")
+            else:
+                if retry:
+                    self.stats["failed"] -= 1
+                    self.failed_ids.remove(doc["_id"])
+                if result is not None:
+                    operations.append(result)
+        if operations and not self.dry_run:
+            write = self.collection.bulk_write(operations, ordered=False)
+            self.stats["updated"] += write.modified_count
+
+    async def retry_failed(self, semaphore: asyncio.Semaphore, limiter: RateLimiter):
+        """One more attempt at every profile that failed, for transient LLM or database errors."""
+        pending = list(self.failed_ids)
+        for start in range(0, len(pending), self.batch_size):
+            ids = pending[start:start + self.batch_size]
+            batch = self._find({"$and": [stale_filter(self.targets), {"_id": {"$in": ids}}]})
+            # Profiles no longer stale were updated elsewhere in the meantime
+            retried = {doc["_id"] for doc in batch}
+            for _id in ids:
+                if _id not in retried:
+                    self.failed_ids.remove(_id)
+                    self.stats["failed"] -= 1
+            if batch:
+                logger.info(f"Retrying {len(batch)} failed profiles")
+                await self.process_batch(batch, semaphore, limiter, retry=True)
+            self.save_checkpoint()
+
+    async def run(self, limit: Optional[int] = None) -> Dict:
+        self.load_checkpoint()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.llm_rate, burst=self.concurrency)
+        started = time.perf_counter()
+        seen = 0
+        finished = False
+        while limit is None or seen < limit:
+            batch = self.next_batch()
+            if limit is not None:
+                batch = batch[:limit - seen]
+            if not batch:
+                finished = True
+                break
+            seen += len(batch)
+            await self.process_batch(batch, semaphore, limiter)
+            self.last_id = batch[-1]["_id"]
+            self.save_checkpoint()
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Reprocessed {self.stats['processed']} profiles "
+                f"({self.stats['updated']} updated, {self.stats['failed']} failed, "
+                f"{self.stats['llm_calls']} LLM calls) in {elapsed:.1f}s"
+            )
+            if self.batch_pause:
+                await asyncio.sleep(self.batch_pause)
+        if finished:
+            await self.retry_failed(semaphore, limiter)
+            if self.failed_ids:
+                # Keep the checkpoint so the next run starts past the profiles done and retries these
+                logger.warning(f"{len(self.failed_ids)} profiles still failing: {[str(i) for i in self.failed_ids]}")
+            else:
+                self.clear_checkpoint()
+        return self.stats
@@ -0,0 +1,105 @@
+import re
+import time
+import logging
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import re2  # google-re2: guaranteed linear-time matching
+except ImportError:
+    re2 = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Untrusted text is scanned in windows so that one pathological region cannot
+# stall the whole document, and the budget is checked between windows.
+CHUNK_CHARS = 4096
+DEFAULT_MAX_SCAN_CHARS = 200_000
+
+LOOKBEHIND_PREFIX = re.compile(r"^\(\?<!(?:\[[^\]]*\]|[^)])*\)")
+
+
+class MatchBudget:
+    """Wall-clock budget shared by every pattern run over one document."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds
+        self.degraded: List[str] = []
+
+    @property
+    def exhausted(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+    def mark_degraded(self, name: str):
+        if name not in self.degraded:
+            self.degraded.append(name)
+            logger.warning(f"Regex budget of {self.seconds * 1000:.0f} ms exhausted during '{name}', returning partial results")
+
+
+class SafePattern:
+    """
+    A pattern that runs on RE2 when the optional `re2` module is installed,
+    and on the stdlib engine otherwise. For the stdlib engine the pattern
+    itself must be written to run in linear time (bounded quantifiers,
+    token-start guards via a leading negative lookbehind). RE2 has no
+    lookbehind but needs no guard, so a leading `(?<!...)` is dropped there.
+
+    Matching scans at most `max_scan_chars` in CHUNK_CHARS windows that
+    overlap by `max_span`. A match is only lost if it crosses a window edge
+    and is longer than `max_span`.
+    """
+
+    def __init__(self, name: str, pattern: str, flags: int = 0, max_span: int = 256,
+                 max_scan_chars: int = DEFAULT_MAX_SCAN_CHARS):
+        self.name = name
+        self.pattern = pattern
+        self.max_span = max_span
+        self.max_scan_chars = max_scan_chars
+        self.engine = "re"
+        self._compiled = None
+        if re2 is not None:
+            try:
+                options = re2.Options()
+                options.case_sensitive = not flags & re.IGNORECASE
+                self._compiled = re2.compile(LOOKBEHIND_PREFIX.sub("", pattern), options)
+                self.engine = "re2"
+            except Exception as e:
+                logger.warning(f"Pattern '{name}' not RE2-compatible, using re: {e}")
+        if self._compiled is None:
+            self._compiled = re.compile(pattern, flags)
+
+    def finditer(self, text: str, budget: Optional[MatchBudget] = None) -> Iterator[str]:
+        end = min(len(text), self.max_scan_chars)
+        pos = 0
+        while pos < end:
+            if budget is not None and budget.exhausted:
+                budget.mark_degraded(self.name)
+                return
+            window_end = min(pos + CHUNK_CHARS, end)
+            scan_end = min(window_end + self.max_span, end)
+            last_end = window_end
+            for match in self._compiled.finditer(text, pos, scan_end):
+                if match.start() >= window_end:
+                    break
+                last_end = max(last_end, match.end())
+                yield match.group(0)
+            # Resume after a match that ran past the window so it is not reported twice
+            pos = last_end
+
+    def search(self, text: str, budget: Optional[MatchBudget] = None,
+               accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """First match (that `accept` approves, if given); stops scanning as soon as one is found."""
+        for match in self.finditer(text, budget):
+            if accept is None or accept(match):
+                return match
+        return None
+
+    def findall(self, text: str, budget: Optional[MatchBudget] = None, limit: Optional[int] = None) -> List[str]:
+        matches = []
+        for match in self.finditer(text, budget):
+            matches.append(match)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
@@ -0,0 +1,366 @@
+import re
+import bisect
+import threading
+import time
+import datetime
+import logging
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from .skill_taxonomy import get_skill_matcher
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SKILL_CATEGORIES = ["technical_skills", "soft_skills", "languages", "other_skills"]
+
+# A posting list stays a sorted ordinal array until a bitset would be smaller
+# (4 bytes per hit vs. one bit per profile); below this size it always stays sparse.
+DENSE_MIN_POSTINGS = 64
+
+SYNC_BATCH_SIZE = 5000
+# updated_at is stamped by each app server's clock, so the watermark trails the
+# start of a sync by this much; documents read twice are simply re-added
+WATERMARK_SKEW = datetime.timedelta(seconds=5)
+
+
+def normalize_term(value) -> Optional[str]:
+    """Lower-case, trim and collapse whitespace so 'Node.JS ' and 'node.js' share a posting list."""
+    if not isinstance(value, (str, int, float)):
+        return None
+    value = re.sub(r"\s+", " ", str(value)).strip().strip(",;:.").lower()
+    return value or None
+
+
+def normalize_skill(skill) -> Optional[str]:
+    """Map aliases onto the taxonomy's canonical name first, so 'k8s' and 'Kubernetes' share a posting list."""
+    if isinstance(skill, str):
+        canonical = get_skill_matcher().canonical(skill)
+        if canonical:
+            return canonical.lower()
+    return normalize_term(skill)
+
+
+def profile_terms(profile: Dict) -> List[str]:
+    """
+    Build the searchable terms for a structured profile, e.g. 'skill:python',
+    'state:texas', 'cert:aws certified developer'. Stored on the document as
+    `search_terms` (multikey index) and used as posting-list keys in memory.
+    """
+    terms: Set[str] = set()
+
+    skills = profile.get("skills") or {}
+    if isinstance(skills, dict):
+        for category in SKILL_CATEGORIES:
+            for skill in skills.get(category) or []:
+                norm = normalize_skill(skill)
+                if norm:
+                    terms.add(f"skill:{norm}")
+
+    state = normalize_term(profile.get("state"))
+    if state:
+        terms.add(f"state:{state}")
+
+    for cert in profile.get("certifications") or []:
+        name = cert.get("name") if isinstance(cert, dict) else cert
+        norm = normalize_term(name)
+        if norm:
+            terms.add(f"cert:{norm}")
+
+    return sorted(terms)
+
+
+def query_terms(skills: Iterable = (), states: Iterable = (), certs: Iterable = ()) -> List[str]:
+    terms = []
+    for prefix, values in (("skill", skills), ("state", states), ("cert", certs)):
+        for value in values:
+            norm = normalize_skill(value) if prefix == "skill" else normalize_term(value)
+            if norm:
+                terms.append(f"{prefix}:{norm}")
+    return terms
+
+
+def iter_bits(bits: int, offset: int = 0, limit: Optional[int] = None) -> Iterator[int]:
+    """Yield set bit positions in ascending order, skipping `offset` hits and stopping after `limit`."""
+    if bits <= 0 or (limit is not None and limit <= 0):
+        return
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    skipped = 0
+    emitted = 0
+    for byte_index, byte in enumerate(raw):
+        if not byte:
+            continue
+        if skipped + bin(byte).count("1") <= offset:
+            skipped += bin(byte).count("1")
+            continue
+        for bit in range(8):
+            if byte & (1 << bit):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                yield byte_index * 8 + bit
+                emitted += 1
+                if limit is not None and emitted >= limit:
+                    return
+
+
+def ordinals_to_bits(ordinals: Iterable[int]) -> int:
+    """Bitset of `ordinals`, built in one bytearray instead of one big-int copy per ordinal."""
+    ordinals = list(ordinals)
+    if not ordinals:
+        return 0
+    buf = bytearray((max(ordinals) >> 3) + 1)
+    for ordinal in ordinals:
+        buf[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buf, "little")
+
+
+class PostingIndex:
+    """
+    In-memory inverted index from search term to the document ordinals that
+    contain it. Frequent terms (taxonomy skills, states) are bitsets (Python
+    int); rare ones (most cert names and free-text skills are unique) are
+    sorted `array('I')` lists, so a term costs memory in proportion to its
+    hits rather than to the number of profiles. Boolean queries are bitwise
+    AND/OR/AND-NOT over the posting lists, with sparse lists expanded per
+    query; ranked queries use bit-sliced counters so scoring stays in
+    big-int operations instead of per-document Python loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the one thread loading or syncing from Mongo; queries only wait on _lock
+        self._sync_lock = threading.Lock()
+        self._postings: Dict[str, Union[int, array]] = {}
+        self._usernames: List[Optional[str]] = []
+        self._ordinals: Dict[str, int] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._live = 0
+        self.loaded = False
+        self.watermark = None
+        self.last_sync = 0.0
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def add(self, username: str, terms: Iterable[str]):
+        with self._lock:
+            ordinal = self._ordinals.get(username)
+            if ordinal is None:
+                ordinal = len(self._usernames)
+                self._usernames.append(username)
+                self._ordinals[username] = ordinal
+            else:
+                self._clear(ordinal)
+            bit = 1 << ordinal
+            doc_terms = sorted(set(terms))
+            for term in doc_terms:
+                self._add_posting(term, ordinal, bit)
+            self._doc_terms[ordinal] = doc_terms
+            self._live |= bit
+
+    def _add_posting(self, term: str, ordinal: int, bit: int):
+        posting = self._postings.get(term)
+        if posting is None:
+            self._postings[term] = array("I", [ordinal])
+        elif isinstance(posting, int):
+            self._postings[term] = posting | bit
+        else:
+            if not posting or ordinal > posting[-1]:
+                posting.append(ordinal)
+            else:
+                bisect.insort(posting, ordinal)
+            if len(posting) >= DENSE_MIN_POSTINGS and len(posting) * 32 > len(self._usernames):
+                self._postings[term] = ordinals_to_bits(posting)
+
+    def _bits(self, term: str) -> int:
+        posting = self._postings.get(term, 0)
+        return posting if isinstance(posting, int) else ordinals_to_bits(posting)
+
+    def remove(self, username: str):
+        with self._lock:
+            ordinal = self._ordinals.pop(username, None)
+            if ordinal is None:
+                return
+            self._clear(ordinal)
+            self._usernames[ordinal] = None
+
+    def _clear(self, ordinal: int):
+        mask = ~(1 << ordinal)
+        for term in self._doc_terms.pop(ordinal, []):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            if isinstance(posting, int):
+                posting &= mask
+                if posting:
+                    self._postings[term] = posting
+            else:
+                i = bisect.bisect_left(posting, ordinal)
+                if i < len(posting) and posting[i] == ordinal:
+                    del posting[i]
+            if not posting:
+                self._postings.pop(term, None)
+        self._live &= mask
+
+    def match(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (), none_of: Iterable[str] = ()) -> int:
+        """Return the bitset of documents containing every `all_of`, at least one `any_of` and no `none_of` term."""
+        with self._lock:
+            result = self._live
+            for term in all_of:
+                result &= self._bits(term)
+                if not result:
+                    return 0
+            any_of = list(any_of)
+            if any_of:
+                union = 0
+                for term in any_of:
+                    union |= self._bits(term)
+                result &= union
+            for term in none_of:
+                result &= ~self._bits(term)
+            return result
+
+    def ranked(self, terms: List[str], candidates: int) -> List[Tuple[int, int]]:
+        """
+        Group `candidates` by how many of `terms` they contain, best first.
+        Returns (score, bitset) pairs; counters are kept as bit planes and
+        updated with ripple-carry adds, one per posting list.
+        """
+        with self._lock:
+            planes: List[int] = []
+            for term in terms:
+                carry = self._bits(term) & candidates
+                i = 0
+                while carry:
+                    if i == len(planes):
+                        planes.append(0)
+                    planes[i], carry = planes[i] ^ carry, planes[i] & carry
+                    i += 1
+        groups = []
+        for score in range(len(terms), 0, -1):
+            if score >= (1 << len(planes)):
+                continue
+            group = candidates
+            for i, plane in enumerate(planes):
+                group &= plane if score >> i & 1 else ~plane
+                if not group:
+                    break
+            if group:
+                groups.append((score, group))
+        return groups
+
+    def usernames(self, ordinals: Iterable[int]) -> List[str]:
+        with self._lock:
+            return [self._usernames[o] for o in ordinals if self._usernames[o] is not None]
+
+    def count(self, bits: int) -> int:
+        return bits.bit_count() if bits > 0 else 0
+
+    def page(self, groups: List[Tuple[int, int]], offset: int, limit: int) -> List[Tuple[str, int]]:
+        """Slice (username, score) pairs out of ranked groups without materialising the full result."""
+        hits = []
+        for score, bits in groups:
+            size = self.count(bits)
+            if offset >= size:
+                offset -= size
+                continue
+            for ordinal in iter_bits(bits, offset, limit - len(hits)):
+                hits.append((ordinal, score))
+            offset = 0
+            if len(hits) >= limit:
+                break
+        with self._lock:
+            return [(self._usernames[o], s) for o, s in hits if self._usernames[o] is not None]
+
+
+def ensure_search_indexes(collection):
+    """Create the Mongo indexes backing search and incremental index refresh."""
+    import pymongo
+    collection.create_index([("search_terms", pymongo.ASCENDING)], name="search_terms_multikey")
+    collection.create_index([("search_terms", pymongo.TEXT)], name="search_terms_text", default_language="none")
+    collection.create_index([("updated_at", pymongo.ASCENDING)], name="updated_at")
+
+
+def sync_index(index: PostingIndex, collection, refresh_seconds: float = 30.0, force: bool = False,
+               blocking: bool = True):
+    """
+    Load the posting lists from Mongo, then pull only documents whose
+    `updated_at` moved past the watermark. The watermark is the time the
+    previous sync started (less WATERMARK_SKEW), not the newest `updated_at`
+    it read, so a profile re-uploaded while an unsorted load was running is
+    picked up by the next sync. Documents are fetched in batches without the
+    index lock, which is only taken to apply each batch, so queries are not
+    blocked by Mongo reads. Only the fields needed to build terms are
+    projected, never `pdfText` or `resumePdf`. With `blocking=False`
+    (request path) the call returns at once if another thread is already
+    loading or syncing.
+    """
+    now = time.monotonic()
+    if index.loaded and not force and now - index.last_sync < refresh_seconds:
+        return
+    if not index._sync_lock.acquire(blocking=blocking):
+        return
+    try:
+        if index.loaded and not force and now - index.last_sync < refresh_seconds:
+            return
+        started = time.perf_counter()
+        sync_started = datetime.datetime.utcnow() - WATERMARK_SKEW
+        query = {"updated_at": {"$gt": index.watermark}} if index.loaded and index.watermark else {}
+        projection = {"_id": 0, "username": 1, "search_terms": 1, "skills": 1, "state": 1, "certifications": 1}
+        loaded = 0
+        cursor = collection.find(query, projection, batch_size=SYNC_BATCH_SIZE)
+        try:
+            while True:
+                batch = []
+                for doc in cursor:
+                    if doc.get("username"):
+                        terms = doc.get("search_terms")
+                        batch.append((doc["username"], profile_terms(doc) if terms is None else terms))
+                    if len(batch) >= SYNC_BATCH_SIZE:
+                        break
+                if not batch:
+                    break
+                with index._lock:
+                    for username, terms in batch:
+                        index.add(username, terms)
+                loaded += len(batch)
+        finally:
+            cursor.close()
+        index.watermark = sync_started
+        index.loaded = True
+        index.last_sync = time.monotonic()
+        if loaded:
+            logger.info(f"Search index synced {loaded} profiles in {(time.perf_counter() - started) * 1000:.1f} ms")
+    finally:
+        index._sync_lock.release()
+
+
+def load_index_in_background(index: PostingIndex, collection) -> threading.Thread:
+    """Initial load at startup, off the request path; searches use Mongo until `index.loaded` is set."""
+    def load():
+        try:
+            sync_index(index, collection, force=True)
+        except Exception as e:
+            logger.error(f"Search index load failed, searches will use Mongo: {e}")
+
+    thread = threading.Thread(target=load, name="search-index-load", daemon=True)
+    thread.start()
+    return thread
+
+
+def mongo_filter(all_of: List[str], any_of: List[str], none_of: List[str], text: Optional[str] = None) -> Dict:
+    """Equivalent Mongo filter for when the in-memory index is bypassed (e.g. free-text queries)."""
+    conditions: Dict = {}
+    terms_filter: Dict = {}
+    if all_of:
+        terms_filter["$all"] = all_of
+    if none_of:
+        terms_filter["$nin"] = none_of
+    if terms_filter:
+        conditions["search_terms"] = terms_filter
+    if any_of:
+        conditions.setdefault("$and", []).append({"search_terms": {"$in": any_of}})
+    if text:
+        conditions["$text"] = {"$search": text}
+    return conditions
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "skill_taxonomy.json")
+
+# Skill tokens keep the characters that matter in tech names: C++, C#, Node.js, CI/CD, .NET
+TOKEN_PATTERN = re.compile(r"\.?[a-z0-9+#]+(?:[./][a-z0-9+#]+)*")
+ITEM_SPLIT_PATTERN = re.compile(r"[,;|•·\n]+|\s+-\s+")
+# 'and' only separates items when every part is a known skill ('Go and Rust'),
+# so 'Research and Development' stays one fragment
+AND_SPLIT_PATTERN = re.compile(r"\s+(?:and|&)\s+", re.IGNORECASE)
+
+# Sentinel placed between items when a whole list is matched in one pass; never part of a pattern
+ITEM_BOUNDARY = "\x00"
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class SkillEntry:
+    __slots__ = ("name", "category", "group")
+
+    def __init__(self, name: str, category: str, group: str):
+        self.name = name
+        self.category = category
+        self.group = group
+
+    def __repr__(self):
+        return f"SkillEntry({self.name!r}, {self.category!r}, {self.group!r})"
+
+
+class SkillMatcher:
+    """
+    Token-level Aho-Corasick automaton over every canonical skill name and
+    alias in the taxonomy. A list of skills is matched in a single pass by
+    joining the items with a boundary token, so classifying a long skills
+    section costs one scan instead of one regex alternation per item.
+
+    Single-letter names and the taxonomy's `ambiguous` words (Go, Shell,
+    Swift, Research...) are common outside skill names, so they are only
+    recognised when they are a whole item, never inside a longer fragment.
+    """
+
+    def __init__(self, taxonomy: Dict):
+        self.version = taxonomy.get("version", 1)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, SkillEntry]]] = [[]]
+        self._exact: Dict[str, SkillEntry] = {}
+        self._vocab = set()
+        self._ambiguous = {" ".join(tokenize(word)) for word in taxonomy.get("ambiguous", [])}
+        self.entries: Dict[str, SkillEntry] = {}
+        for category, groups in taxonomy.get("categories", {}).items():
+            for group, skills in groups.items():
+                for name, aliases in skills.items():
+                    entry = SkillEntry(name, category, group)
+                    self.entries[name.lower()] = entry
+                    for surface in [name] + list(aliases or []):
+                        self._add(surface, entry)
+        self._build()
+
+    def _add(self, surface: str, entry: SkillEntry):
+        tokens = tokenize(surface)
+        if not tokens:
+            return
+        self._vocab.update(tokens)
+        key = " ".join(tokens)
+        self._exact.setdefault(key, entry)
+        # Single-letter and ambiguous names (C, R, Go, Shell) are only trusted when they are the whole item
+        if len(tokens) == 1 and (len(tokens[0]) == 1 or tokens[0] in self._ambiguous):
+            return
+        node = 0
+        for token in tokens:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if not any(e is entry for _, e in self._out[node]):
+            self._out[node].append((len(tokens), entry))
+
+    def _build(self):
+        queue = deque()
+        for child in self._goto[0].values():
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def tokens(self, text: str) -> List[str]:
+        """Tokenize, splitting slash compounds the taxonomy does not know (HTML/CSS) but keeping CI/CD."""
+        tokens = []
+        for token in tokenize(text):
+            if "/" in token and token not in self._vocab:
+                tokens.extend(t for t in token.split("/") if t)
+            else:
+                tokens.append(token)
+        return tokens
+
+    def scan(self, tokens: List[str]) -> List[Tuple[int, int, SkillEntry]]:
+        """Return leftmost-longest, non-overlapping (start, end, entry) matches over `tokens`."""
+        raw = []
+        node = 0
+        for i, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for length, entry in self._out[node]:
+                raw.append((i - length + 1, i + 1, entry))
+        raw.sort(key=lambda m: (m[0], m[0] - m[1]))
+        matches = []
+        last_end = 0
+        for start, end, entry in raw:
+            if start >= last_end:
+                matches.append((start, end, entry))
+                last_end = end
+        return matches
+
+    def lookup(self, skill: str) -> Optional[SkillEntry]:
+        """Exact lookup of a single skill by canonical name or alias."""
+        return self._exact.get(" ".join(self.tokens(skill)))
+
+    def canonical(self, skill: str) -> Optional[str]:
+        entry = self.lookup(skill)
+        return entry.name if entry else None
+
+    def classify(self, skills: Iterable) -> Dict[str, List[str]]:
+        """
+        Classify and canonicalize a list of skill strings (or whole skill lines
+        such as 'Python, Docker, K8s') into technical_skills, soft_skills,
+        languages and other_skills. Matching runs once over the concatenated
+        token stream; leftover fragments that match nothing land in other_skills.
+        """
+        result = {"technical_skills": [], "soft_skills": [], "languages": [], "other_skills": []}
+        seen = set()
+
+        tokens: List[str] = []
+        fragments: List[Tuple[str, int, int]] = []
+        for item in skills:
+            if not isinstance(item, (str, int, float)):
+                continue
+            for fragment in ITEM_SPLIT_PATTERN.split(str(item)):
+                fragment = fragment.strip(" \t:-*()[]")
+                if not fragment:
+                    continue
+                start = len(tokens)
+                tokens.extend(self.tokens(fragment))
+                fragments.append((fragment, start, len(tokens)))
+                tokens.append(ITEM_BOUNDARY)
+
+        matches = self.scan(tokens)
+        m = 0
+        for fragment, start, end in fragments:
+            hit = False
+            while m < len(matches) and matches[m][0] < end:
+                if matches[m][0] >= start:
+                    self._append(result, seen, matches[m][2])
+                    hit = True
+                m += 1
+            if hit:
+                continue
+            entry = self._exact.get(" ".join(tokens[start:end]))
+            parts = [self.lookup(part) for part in AND_SPLIT_PATTERN.split(fragment)] if not entry else []
+            if entry:
+                self._append(result, seen, entry)
+            elif len(parts) > 1 and all(parts):
+                for part in parts:
+                    self._append(result, seen, part)
+            elif fragment.lower() not in seen:
+                seen.add(fragment.lower())
+                result["other_skills"].append(fragment)
+        return result
+
+    @staticmethod
+    def _append(result: Dict[str, List[str]], seen: set, entry: SkillEntry):
+        if entry.name.lower() in seen:
+            return
+        seen.add(entry.name.lower())
+        result.get(entry.category, result["other_skills"]).append(entry.name)
+
+
+def load_taxonomy(path: Optional[str] = None) -> Dict:
+    """
+    Load the bundled taxonomy and merge any extra taxonomy file named by
+    SKILL_TAXONOMY_PATH (same JSON layout) on top of it.
+    """
+    with open(DEFAULT_TAXONOMY_PATH, encoding="utf-8") as f:
+        taxonomy = json.load(f)
+    extra_path = path or os.getenv("SKILL_TAXONOMY_PATH")
+    if extra_path:
+        with open(extra_path, encoding="utf-8") as f:
+            extra = json.load(f)
+        taxonomy["ambiguous"] = sorted(set(taxonomy.get("ambiguous", [])) | set(extra.get("ambiguous", [])))
+        for category, groups in extra.get("categories", {}).items():
+            for group, skills in groups.items():
+                taxonomy["categories"].setdefault(category, {}).setdefault(group, {}).update(skills)
+        taxonomy["version"] = f"{taxonomy.get('version')}+{extra.get('version', 'custom')}"
+    return taxonomy
+
+
+_matcher: Optional[SkillMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_skill_matcher() -> SkillMatcher:
+    """Build the matcher once per process; later calls reuse the compiled automaton."""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = SkillMatcher(load_taxonomy())
+                logger.info(f"Skill taxonomy v{_matcher.version} loaded with {len(_matcher.entries)} skills")
+    return _matcher
+
+
+def classify_skills(skills: Iterable) -> Dict[str, List[str]]:
+    return get_skill_matcher().classify(skills)
@@ -7,5 +7,13 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key")
     MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/resume_parser")
     HUGGINGFACE_API_KEY = os.environ.get("HUGGINGFACE_API_KEY")
+    LOCAL_QA_MODEL_DIR = os.environ.get("LOCAL_QA_MODEL_DIR", "data/models/resume_parser_model")
     UPLOAD_FOLDER = "app/static/uploads"
-    ALLOWED_EXTENSIONS = {".pdf", ".docx"}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {".pdf", ".docx"}
+    ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+    PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", "4"))
+    PIPELINE_CACHE_ENTRIES = int(os.environ.get("PIPELINE_CACHE_ENTRIES", "256"))
+    PIPELINE_CACHE_STAGES = [s for s in os.environ.get("PIPELINE_CACHE_STAGES", "extract").split(",") if s]
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_SECONDS", "0.005"))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "data/profiles")
\ No newline at end of file
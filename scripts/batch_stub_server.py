@@ -0,0 +1,111 @@
+# Local stand-in for the Message Batches endpoints, for exercising
+# `python app.py import` without an API key:
+#   python scripts/batch_stub_server.py --port 8089 --fail-rate 0.2
+#   ANTHROPIC_BASE_URL=http://localhost:8089 LLM_BATCH_POLL_SECONDS=1 python app.py import data/sample_resumes
+import re
+import json
+import uuid
+import random
+import argparse
+import datetime
+from aiohttp import web
+
+batches = {}
+
+
+def fake_extraction(params):
+    """Answer with the same ```json block shape the real prompt asks for, filled from simple regexes."""
+    prompt = params["messages"][0]["content"]
+    resume = prompt.split("Resume text:\n", 1)[-1]
+    email = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", resume)
+    data = {
+        "name": resume.split()[0] + " " + resume.split()[1] if len(resume.split()) > 1 else None,
+        "email": email.group() if email else None,
+        "phone": None,
+        "state": None,
+        "social_media": {"linkedin": None, "github": None, "twitter": None, "portfolio": None, "other": []},
+        "career_objective": None,
+        "education": None,
+        "experience": None,
+        "skills": {"technical_skills": [], "soft_skills": [], "languages": [], "other_skills": []},
+        "projects": None,
+        "certifications": None,
+        "achievements": None
+    }
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model"),
+        "content": [{"type": "text", "text": "```json\n" + json.dumps(data) + "\n```"}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": 200}
+    }
+
+
+def batch_view(batch, request):
+    return {
+        "id": batch["id"],
+        "type": "message_batch",
+        "processing_status": "ended" if batch["polls"] >= request.app["polls_until_done"] else "in_progress",
+        "request_counts": batch["counts"],
+        "created_at": batch["created_at"],
+        "results_url": f"{request.scheme}://{request.host}/v1/messages/batches/{batch['id']}/results"
+    }
+
+
+async def create_batch(request):
+    body = await request.json()
+    batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+    results = []
+    counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+    for item in body.get("requests", []):
+        if random.random() < request.app["fail_rate"]:
+            result = {"type": "errored", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+        else:
+            result = {"type": "succeeded", "message": fake_extraction(item["params"])}
+        counts[result["type"]] += 1
+        results.append({"custom_id": item["custom_id"], "result": result})
+    batches[batch_id] = {
+        "id": batch_id,
+        "results": results,
+        "counts": counts,
+        "polls": 0,
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z"
+    }
+    return web.json_response(batch_view(batches[batch_id], request))
+
+
+async def get_batch(request):
+    batch = batches.get(request.match_info["batch_id"])
+    if not batch:
+        return web.json_response({"type": "error", "error": {"type": "not_found_error"}}, status=404)
+    batch["polls"] += 1
+    return web.json_response(batch_view(batch, request))
+
+
+async def get_results(request):
+    batch = batches.get(request.match_info["batch_id"])
+    if not batch:
+        return web.json_response({"type": "error", "error": {"type": "not_found_error"}}, status=404)
+    body = "\n".join(json.dumps(line) for line in batch["results"]) + "\n"
+    return web.Response(text=body, content_type="application/x-jsonl")
+
+
+def make_app(fail_rate=0.0, polls_until_done=1):
+    app = web.Application(client_max_size=256 * 1024 * 1024)
+    app["fail_rate"] = fail_rate
+    app["polls_until_done"] = polls_until_done
+    app.router.add_post("/v1/messages/batches", create_batch)
+    app.router.add_get("/v1/messages/batches/{batch_id}", get_batch)
+    app.router.add_get("/v1/messages/batches/{batch_id}/results", get_results)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Message Batches API stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of items returned as errored")
+    parser.add_argument("--polls-until-done", type=int, default=1, help="Status polls before a batch reports ended")
+    args = parser.parse_args()
+    web.run_app(make_app(args.fail_rate, args.polls_until_done), port=args.port)
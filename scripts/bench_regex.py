@@ -0,0 +1,107 @@
+# Fuzz/benchmark harness for the contact-field regexes in app/utils/contact_fields.py,
+# over the whole text and over the lines of a links section (social_line_platforms).
+# Feeds adversarial OCR-style noise and fails if any document exceeds the latency bound:
+#   python scripts/bench_regex.py --docs 200 --size 200000 --max-ms 300
+# Add --legacy to time the original unguarded patterns on the same inputs for comparison.
+import os
+import re
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.contact_fields import SOCIAL_LINE_MAX_CHARS, build_contact_patterns, extract_regex_fields, social_line_platforms
+from app.utils.safe_regex import MatchBudget
+
+STATES = ["California", "New York", "North Carolina", "Texas", "Washington", "West Virginia"]
+
+LEGACY_PATTERNS = {
+    "email": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    "phone": r"(\+?\d{1,3})?[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?:\s?(?:x|ext\.?)\s?\d{1,5})?",
+    "portfolio": r"(?:https?://)?(?:www\.)?[a-zA-Z0-9-]+\.[a-zA-Z]{2,}/?(?:portfolio)?(?:/[a-zA-Z0-9-]+)?/?",
+}
+# What structure_resume_for_storage ran over every line of a links section
+LEGACY_SECTION_PATTERNS = [r"linkedin\.com", r"github\.com", r"(?:twitter\.com|x\.com)", r"(?:portfolio|[a-zA-Z0-9-]+\.[a-zA-Z]{2,}/)"]
+
+
+def adversarial_inputs(size, rng):
+    """Inputs aimed at the backtracking hot spots: long runs with no terminator for the greedy classes."""
+    yield "long-alnum-run", "a" * size
+    yield "dotted-run", "a." * (size // 2)
+    yield "at-run", ("a" * 50 + "@") * (size // 51)
+    yield "domain-no-tld", "x@" + "a-" * (size // 2)
+    yield "digit-run", "1" * size
+    yield "phone-fragments", "1-2-3 (555) 12-" * (size // 15)
+    yield "url-no-tld", ("www." + "b" * 60 + " ") * (size // 65)
+    noise_chars = string.ascii_letters + string.digits + ".-@/_ |\n"
+    yield "ocr-noise", "".join(rng.choice(noise_chars) for _ in range(size))
+    words = ["Jhon", "D0e", "emai1", "john.doe@exarnple.corn", "+1", "(555)", "123-4567", "linkedin.com/in/jd", "Texas", "|||", "l1l1l1"]
+    yield "ocr-words", " ".join(rng.choice(words) for _ in range(size // 6))
+    # Links-section lines just under the length cap, so every one is actually scanned
+    yield "links-lines", ("c" * (SOCIAL_LINE_MAX_CHARS - 1) + "\n") * (size // SOCIAL_LINE_MAX_CHARS)
+
+
+def run_safe(text, patterns, budget_seconds):
+    started = time.perf_counter()
+    budget = MatchBudget(budget_seconds)
+    extract_regex_fields(text, patterns, budget)
+    # The same text as a links section, as one budget-sharing pass per document
+    section_budget = MatchBudget(budget_seconds)
+    for line in text.splitlines():
+        social_line_platforms(line, patterns, section_budget)
+    return (time.perf_counter() - started) * 1000, budget.degraded + section_budget.degraded
+
+
+def run_legacy(text):
+    started = time.perf_counter()
+    for pattern in LEGACY_PATTERNS.values():
+        re.findall(pattern, text, re.IGNORECASE)
+    for line in text.splitlines():
+        for pattern in LEGACY_SECTION_PATTERNS:
+            re.search(pattern, line, re.IGNORECASE)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worst-case latency check for resume regexes")
+    parser.add_argument("--docs", type=int, default=50, help="Random noise documents on top of the fixed adversarial set")
+    parser.add_argument("--size", type=int, default=200_000, help="Characters per document")
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="Per-document matching budget")
+    parser.add_argument("--max-ms", type=float, default=300.0, help="Fail if any document takes longer")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--legacy", action="store_true", help="Also time the original patterns (can take minutes)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patterns = build_contact_patterns(STATES)
+    engine = next(iter(patterns.values())).engine
+    worst = (0.0, None)
+    degraded_docs = 0
+    cases = list(adversarial_inputs(args.size, rng))
+    for i in range(args.docs):
+        noise = "".join(rng.choice(string.printable) for _ in range(args.size))
+        cases.append((f"random-{i}", noise))
+
+    for name, text in cases:
+        ms, degraded = run_safe(text, patterns, args.budget_ms / 1000)
+        degraded_docs += bool(degraded)
+        if ms > worst[0]:
+            worst = (ms, name)
+        if not name.startswith("random-"):
+            line = f"{name:18s} {ms:9.2f} ms" + (f"  degraded: {', '.join(degraded)}" if degraded else "")
+            if args.legacy:
+                line += f"  legacy: {run_legacy(text):9.2f} ms"
+            print(line)
+
+    print(f"engine={engine} docs={len(cases)} size={args.size} worst={worst[0]:.2f} ms ({worst[1]}) degraded={degraded_docs}")
+    if worst[0] > args.max_ms:
+        print(f"FAIL: worst case {worst[0]:.2f} ms exceeds bound {args.max_ms} ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,180 @@
-# Placeholder for fine-tuning a Hugging Face model
-# Requires a labeled dataset of resumes
+# Fine-tune a small extractive QA model on stored profiles so parse_resume can
+# answer its questions locally instead of calling the Hugging Face API.
+#
+#   python -m scripts.fine_tune_model --limit 5000 --epochs 2
+#
+# Weak labels come from the LLM-extracted fields of each profile; the tokenized
+# windows are cached under --cache-dir and reused until the profiles change.
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+
+import pymongo
+import requests
+import torch
 from transformers import AutoModelForQuestionAnswering, AutoTokenizer, Trainer, TrainingArguments
 
-def fine_tune_model():
-    # Load model and tokenizer
-    model_name = "deepset/roberta-base-squad2"
-    model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    
-    # Load your dataset (e.g., JSON with resume text and labeled sections)
-    # Example: [{"text": "John Doe, john@example.com...", "labels": {"Name": "John Doe", ...}}]
-    # dataset = load_your_dataset()
-    
-    # Define training arguments
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import Config
+from app.models.resume_parser import QA_QUESTIONS, LOCAL_CONTEXT_CHARS, API_CONTEXT_CHARS
+from app.models.local_qa import QUANTIZED_WEIGHTS, load_quantized, save_quantized
+from app.utils.qa_dataset import ShardDataset, build_shards, dataset_fingerprint, harvest_examples, load_manifest
+
+REMOTE_QA_MODEL = "deepset/roberta-base-squad2"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else None
+
+
+def latency_summary(samples_ms):
+    if not samples_ms:
+        return None
+    return {
+        "resumes": len(samples_ms),
+        "mean_ms": round(statistics.mean(samples_ms), 1),
+        "p50_ms": round(percentile(samples_ms, 50), 1),
+        "p95_ms": round(percentile(samples_ms, 95), 1)
+    }
+
+
+def bench_local(model_dir, contexts):
+    qa = load_quantized(model_dir)
+    qa(question=QA_QUESTIONS["Name"], context=contexts[0][:LOCAL_CONTEXT_CHARS])  # warm-up
+    samples = []
+    for context in contexts:
+        started = time.perf_counter()
+        for question in QA_QUESTIONS.values():
+            qa(question=question, context=context[:LOCAL_CONTEXT_CHARS], handle_impossible_answer=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return latency_summary(samples)
+
+
+def bench_remote(contexts):
+    """The same questions against the hosted API parse_resume uses today, one request per question."""
+    if not Config.HUGGINGFACE_API_KEY:
+        return None
+    api_url = f"https://api-inference.huggingface.co/models/{REMOTE_QA_MODEL}"
+    headers = {"Authorization": f"Bearer {Config.HUGGINGFACE_API_KEY}"}
+    samples = []
+    with requests.Session() as session:
+        for context in contexts:
+            started = time.perf_counter()
+            for question in QA_QUESTIONS.values():
+                payload = {"inputs": {"question": question, "context": context[:API_CONTEXT_CHARS]}}
+                response = session.post(api_url, headers=headers, json=payload, timeout=30)
+                if response.status_code != 200:
+                    print(f"Remote API returned {response.status_code}; stopping remote benchmark")
+                    return latency_summary(samples)
+            samples.append((time.perf_counter() - started) * 1000)
+    return latency_summary(samples)
+
+
+def directory_size_mb(path, names=None):
+    total = 0
+    for name in os.listdir(path):
+        if names is None or name in names:
+            total += os.path.getsize(os.path.join(path, name))
+    return round(total / (1024 * 1024), 1)
+
+
+def fine_tune_model(args):
+    torch.set_num_threads(args.threads or os.cpu_count())
+    client = pymongo.MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+    collection = client[args.db][args.collection]
+    tokenizer = AutoTokenizer.from_pretrained(args.base_model)
+
+    # Tokenized shards are reused until the settings or the profiles change
+    settings = {"base_model": args.base_model, "max_length": args.max_length, "stride": args.stride, "limit": args.limit}
+    cache_dir = os.path.join(args.cache_dir, dataset_fingerprint(collection, settings))
+    manifest = None if args.rebuild else load_manifest(cache_dir)
+    contexts = []
+    if manifest is None:
+        def examples():
+            for example in harvest_examples(collection, QA_QUESTIONS, limit=args.limit):
+                if len(contexts) < args.bench_samples and example["context"] not in contexts:
+                    contexts.append(example["context"])
+                yield example
+        started = time.perf_counter()
+        manifest = build_shards(examples(), tokenizer, cache_dir, args.max_length, args.stride, args.shard_size)
+        print(f"Tokenized {manifest['windows']} windows in {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"Reusing {manifest['windows']} cached windows from {cache_dir}")
+        for doc in collection.find({"pdfText": {"$nin": [None, ""]}}, {"pdfText": 1}).limit(args.bench_samples):
+            contexts.append(doc["pdfText"])
+    if not manifest["windows"]:
+        raise SystemExit("No training windows: no stored profile had labels that could be found in its text")
+
+    model = AutoModelForQuestionAnswering.from_pretrained(args.base_model)
+    steps_per_epoch = math.ceil(manifest["windows"] / args.batch_size)
     training_args = TrainingArguments(
-        output_dir="../data/models/resume_parser_model",
-        evaluation_strategy="epoch",
-        learning_rate=2e-5,
-        per_device_train_batch_size=8,
-        num_train_epochs=3,
-    )
-    
-    # Initialize trainer
-    trainer = Trainer(
-        model=model,
-        args=training_args,
-        train_dataset=None,  # Replace with your dataset
-        eval_dataset=None    # Replace with your dataset
+        output_dir=os.path.join(args.output, "checkpoints"),
+        use_cpu=True,
+        learning_rate=args.learning_rate,
+        per_device_train_batch_size=args.batch_size,
+        max_steps=steps_per_epoch * args.epochs,
+        weight_decay=0.01,
+        logging_steps=50,
+        save_strategy="no",
+        report_to=[],
+        dataloader_num_workers=0
     )
-    
-    # Train and save model
-    trainer.train()
-    model.save_pretrained("../data/models/resume_parser_model")
-    tokenizer.save_pretrained("../data/models/resume_parser_model")
+    trainer = Trainer(model=model, args=training_args, train_dataset=ShardDataset(cache_dir, manifest))
+    metrics = trainer.train().metrics
+
+    weights_path = save_quantized(trainer.model.cpu(), tokenizer, args.output)
+    model.save_pretrained(os.path.join(args.output, "fp32"))
+
+    report = {
+        "dataset": {k: manifest[k] for k in ("examples", "answerable", "windows")},
+        "training": {
+            "runtime_s": round(metrics["train_runtime"], 1),
+            "windows_per_s": round(metrics["train_samples_per_second"], 2),
+            "tokens_per_s": round(metrics["train_samples_per_second"] * args.max_length, 1),
+            "steps_per_s": round(metrics["train_steps_per_second"], 3),
+            "loss": round(metrics.get("train_loss", 0), 4),
+            "threads": torch.get_num_threads()
+        },
+        "model": {
+            "base_model": args.base_model,
+            "fp32_mb": directory_size_mb(os.path.join(args.output, "fp32")),
+            "quantized_mb": directory_size_mb(args.output, {QUANTIZED_WEIGHTS}),
+            "path": weights_path
+        },
+        "latency_per_resume": {
+            "local": bench_local(args.output, contexts) if contexts else None,
+            "remote": bench_remote(contexts) if contexts and not args.skip_remote else None
+        }
+    }
+    with open(os.path.join(args.output, "training_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
 
 if __name__ == "__main__":
-    fine_tune_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fine-tune and export a quantized local QA model for parse_resume")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/anthropic_resumeparser"))
+    parser.add_argument("--db", default="anthropic_resumeparser")
+    parser.add_argument("--collection", default="user_profile_data")
+    parser.add_argument("--limit", type=int, default=None, help="Profiles to harvest (default: all)")
+    parser.add_argument("--base-model", default="distilbert-base-cased-distilled-squad")
+    parser.add_argument("--output", default=Config.LOCAL_QA_MODEL_DIR)
+    parser.add_argument("--cache-dir", default="data/qa_cache")
+    parser.add_argument("--rebuild", action="store_true", help="Re-tokenize even if cached shards exist")
+    parser.add_argument("--max-length", type=int, default=384)
+    parser.add_argument("--stride", type=int, default=128)
+    parser.add_argument("--shard-size", type=int, default=2048)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=3e-5)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--bench-samples", type=int, default=20)
+    parser.add_argument("--skip-remote", action="store_true", help="Do not benchmark the hosted API")
+    fine_tune_model(parser.parse_args())
@@ -0,0 +1,67 @@
+import json
+import random
+import asyncio
+
+from aiohttp.test_utils import TestServer
+
+from app.utils.llm_batch import MessageBatchClient
+from scripts import batch_stub_server
+
+
+def extracted_name(message):
+    return json.loads(message["content"][0]["text"].strip("`").removeprefix("json"))["name"]
+
+
+def params_for(key):
+    return {
+        "model": "claude-3-5-haiku-20241022",
+        "max_tokens": 1024,
+        "messages": [{"role": "user", "content": f"Resume text:\nCandidate {key} {key}@example.com"}]
+    }
+
+
+async def run_against_stub(params_by_key, fail_rate, max_retries):
+    batch_stub_server.batches.clear()
+    server = TestServer(batch_stub_server.make_app(fail_rate=fail_rate))
+    await server.start_server()
+    try:
+        client = MessageBatchClient("test-key", base_url=str(server.make_url("")), poll_interval=0)
+        results = await client.run(params_by_key, max_retries=max_retries)
+    finally:
+        await server.close()
+    # The stub keeps batches in creation order
+    return results, list(batch_stub_server.batches.values())
+
+
+def test_only_errored_items_are_resubmitted():
+    random.seed(7)
+    # Keys that are valid custom ids themselves, including ones shaped like generated ids
+    keys = ["item-1", "bob smith", "résumé.pdf", "item-0", "alice"] + [f"user_{i}" for i in range(45)]
+    params_by_key = {key: params_for(key) for key in keys}
+
+    results, batches = asyncio.run(run_against_stub(params_by_key, fail_rate=0.3, max_retries=3))
+
+    assert len(batches) > 1
+    submitted = [[line["custom_id"] for line in batch["results"]] for batch in batches]
+    assert len(submitted[0]) == len(keys)
+    assert len(set(submitted[0])) == len(keys)
+    for previous, current in zip(batches, submitted[1:]):
+        errored = [line["custom_id"] for line in previous["results"] if line["result"]["type"] == "errored"]
+        assert current == errored
+
+    assert set(results) == set(keys)
+    for key, result in results.items():
+        if "message" in result:
+            assert extracted_name(result["message"]) == f"Candidate {key.split()[0]}"
+        else:
+            assert "error" in result
+
+
+def test_results_map_back_to_keys_without_failures():
+    keys = ["item-1", "carol smith", "item-0"]
+    results, batches = asyncio.run(run_against_stub({key: params_for(key) for key in keys}, fail_rate=0.0, max_retries=2))
+
+    assert len(batches) == 1
+    for key in keys:
+        assert results[key]["attempts"] == 1
+        assert extracted_name(results[key]["message"]) == f"Candidate {key.split()[0]}"